@@ -1,5 +1,11 @@
 import streamlit as st
 import pandas as pd
+from datetime import timedelta
+from analytics.datasets import registry
+from analytics.play_store import TIMEZONE, TIMEZONES, get_play_store, get_date_range
+from analytics.periods import DEFAULT_PERIOD_STARTS, TIME_PERIODS, describe_periods, period_lut
+from analytics.sessions import DEFAULT_GAP_MINUTES
+from visualizations.figure_cache import figures, payload_log
 pd.options.mode.copy_on_write = True 
 
 # ===== 頁面設定 =====
@@ -9,15 +15,16 @@ st.set_page_config(
 )
 
 
-# min_date, max_date = get_date_range()    
-min_date = pd.to_datetime('2025-10-25').date()
-max_date = pd.to_datetime('2026-01-23').date()
+timezone = st.session_state.get('timezone', TIMEZONE)
+store = get_play_store(timezone=timezone)
+min_date, max_date = get_date_range(timezone=timezone)
 
 
 # ===== 首頁內容 =====
 st.title("Spotify Listening Analysis Dashboard - demo")
 
-st.info("demo 版本為了快速顯示結果，不支援時間篩選")
+if store is None:
+    st.info("demo 版本為了快速顯示結果，不支援時間篩選")
 
 st.markdown("---")
 
@@ -37,14 +44,60 @@ st.markdown("---")
 # ===== Sidebar 全域設定（所有頁面共用）=====
 with st.sidebar:
 
-    st.markdown(f"### 📅 分析時間區間：`{min_date}` — `{max_date}`")
-    
-    # if len(date_range) == 2:
-    #     start_date, end_date = date_range
-        
+    if store is None:
+        st.markdown(f"### 📅 分析時間區間：`{min_date}` — `{max_date}`")
+        date_range = (min_date, max_date)
+    else:
+        st.markdown("### 📅 分析時間區間")
+        # 換時區後 store 的日期範圍會差一天，之前選的日期要夾回新的範圍內
+        selected = (st.session_state.get('start_date', max(min_date, max_date - timedelta(days=90))),
+                    st.session_state.get('end_date', max_date))
+        date_range = st.date_input(
+            "選擇日期範圍",
+            value=tuple(min(max(d, min_date), max_date) for d in selected),
+            min_value=min_date,
+            max_value=max_date
+        )
+
+    if len(date_range) == 2:
+        start_date, end_date = date_range
+
         # 儲存到 session_state
-    st.session_state['start_date'] = min_date
-    st.session_state['end_date'] = max_date
-    
-    st.sidebar.markdown("*All times in UTC+8 (Taipei)*")
+        st.session_state['start_date'] = start_date
+        st.session_state['end_date'] = end_date
+
+    if store is not None:
+        st.session_state['session_gap'] = st.number_input(
+            "Session 間隔（分鐘）", min_value=5, max_value=180,
+            value=st.session_state.get('session_gap', DEFAULT_GAP_MINUTES), step=5,
+            help="兩首歌之間閒置超過這個時間，就算新的聆聽 session（影響時段模式、馬拉松聆聽、循環播放）"
+        )
+
+        # 時區在 store 載入時套用，換時區 = 換一份 store
+        selected_tz = st.selectbox("時區", TIMEZONES, index=TIMEZONES.index(timezone) if timezone in TIMEZONES else 0)
+        if selected_tz != timezone:
+            st.session_state['timezone'] = selected_tz
+            st.rerun()
+
+        with st.expander("時段分界"):
+            current = st.session_state.get('period_starts', DEFAULT_PERIOD_STARTS)
+            starts = tuple(st.number_input(f"{name} 開始（時）", min_value=0, max_value=23, value=int(h), step=1)
+                           for name, h in zip(TIME_PERIODS, current))
+            try:
+                period_lut(starts)
+                st.session_state['period_starts'] = starts
+            except ValueError:
+                st.warning("每個時段的開始時間必須不同")
+            st.caption("  \n".join(f"{k}: {v}" for k, v in describe_periods(st.session_state.get('period_starts', current)).items()))
+
+    offset = pd.Timestamp.now(tz=timezone).utcoffset().total_seconds() / 3600
+    st.sidebar.markdown(f"*All times in UTC{offset:+g} ({timezone})*")
+
+    with st.expander("資料快取狀態"):
+        st.caption("每個檔案在整個 process 只載入一次，hits 增加代表沒有再讀 disk")
+        st.dataframe(registry.stats(), hide_index=True, use_container_width=True)
+        st.caption("建好的圖表依資料版本 + 參數快取（JSON），hit_rate 越高代表越少重畫")
+        st.dataframe(figures.stats(), hide_index=True, use_container_width=True)
+        st.caption("各頁最近一次送到前端的圖表大小（KB），over_budget 代表整頁超過 FIGURE_PAGE_BUDGET_KB")
+        st.dataframe(payload_log.stats(), hide_index=True, use_container_width=True)
     
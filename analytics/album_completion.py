@@ -0,0 +1,112 @@
+"""
+專輯完成度：原本 SQL 的 COUNT(DISTINCT track_number) >= MAX(total_tracks)*{prop}
+輸出欄位和 data/page3/ 的 snapshot 相同
+
+每張專輯（馬拉松聆聽則是每個 session × 專輯）維護一個「播放過的 track_number」bitset，
+COUNT(DISTINCT track_number) 就是 bitset 的 popcount，整個區間一次 np.bitwise_or.at 建好，
+不做 groupby + nunique。完成度門檻只是對 popcount / total_tracks 做篩選，滑桿可以即時調整。
+"""
+import numpy as np, pandas as pd
+from analytics.play_store import PlayStore
+from analytics.sessions import DEFAULT_GAP_MINUTES, get_session_ids
+from analytics.streaks import _POPCOUNT
+
+
+def format_duration(s: float) -> str:
+    """秒數轉成 'x hrs y mins' / 'y mins' / 'z secs'"""
+    h, m = int(s // 3600), int(s % 3600 // 60)
+    if h: return f"{h} hrs {m} mins"
+    if m: return f"{m} mins"
+    return f"{round(s)} secs"
+
+
+class AlbumTrackBits:
+    """每筆 play 的專輯代碼與 track_number 在 bitset 中的位置（byte, mask），每個 store 版本算一次"""
+
+    def __init__(self, store: PlayStore):
+        self.albums = store.albums.sort_values('album_id', kind='stable').reset_index(drop=True)
+        plays = store.plays
+        codes = pd.Index(self.albums['album_id']).get_indexer(plays['album_id'])
+        bit = plays['track_number'].fillna(0).to_numpy(dtype=np.int64) - 1  # track_number 從 1 開始
+        self.valid = (codes >= 0) & (bit >= 0)  # catalog 裡找不到的 play 不計
+        bit = np.where(self.valid, bit, 0)
+
+        self.codes = codes.astype(np.int32)
+        self.byte = (bit >> 3).astype(np.int32)
+        self.mask = (1 << (bit & 7)).astype(np.uint8)
+        self.nbytes = int(self.byte.max()) + 1 if len(bit) else 1
+
+    def bitsets(self, keys: np.ndarray, nkeys: int, rows: np.ndarray) -> np.ndarray:
+        """(nkeys, nbytes) 的 bitset：keys[i] 那一列設上 rows[i] 這筆 play 的 track bit"""
+        bits = np.zeros((nkeys, self.nbytes), dtype=np.uint8)
+        np.bitwise_or.at(bits, (keys, self.byte[rows]), self.mask[rows])
+        return bits
+
+
+def get_album_bits(store: PlayStore) -> AlbumTrackBits:
+    return store.derived('album_bits', AlbumTrackBits)
+
+
+def popcount(bits: np.ndarray) -> np.ndarray:
+    return _POPCOUNT[bits].sum(axis=1, dtype=np.int64)
+
+
+def get_album_duration(store: PlayStore, start_date, end_date) -> pd.DataFrame:
+    """每張專輯：播放過的曲目比例 (prop) 與總聆聽時長"""
+    idx = get_album_bits(store)
+    lo, hi = store.bounds(start_date, end_date)
+    rows = lo + np.flatnonzero(idx.valid[lo:hi])
+    codes = idx.codes[rows]
+
+    n = len(idx.albums)
+    played = np.bincount(codes, minlength=n) > 0
+    total = np.bincount(codes, weights=store.plays['duration'].to_numpy()[rows], minlength=n)
+    unique_tracks = popcount(idx.bitsets(codes, n, rows))
+
+    albums = idx.albums[played]
+    df = pd.DataFrame({
+        'main_artists': albums['main_artists'].to_numpy(),
+        'prop': unique_tracks[played] / albums['total_tracks'].to_numpy(),
+        'album': albums['album'].to_numpy(),
+        'sum': total[played]
+    })
+    df = df.sort_values('sum', ascending=False, kind='stable').reset_index(drop=True)
+    df['total_duration'] = df['sum'].map(format_duration)
+    return df
+
+
+def get_marathon_listen(store: PlayStore, start_date, end_date,
+                        gap_minutes: float = DEFAULT_GAP_MINUTES) -> pd.DataFrame:
+    """每個 (session, 專輯)：session 內播放過幾首不同曲目、起訖時間"""
+    idx = get_album_bits(store)
+    lo, hi = store.bounds(start_date, end_date)
+    rows = lo + np.flatnonzero(idx.valid[lo:hi])
+    columns = ['album_id', 'album', 'main_artists', 'session_start', 'session_end',
+               'unique_tracks', 'total_tracks', 'duration_minutes']
+    if len(rows) == 0:
+        return pd.DataFrame(columns=columns)
+
+    # (session, 專輯) 編成一個 int64 key；plays 依時間排序，所以第一筆 / 最後一筆就是起訖時間
+    sessions = get_session_ids(store, gap_minutes)[rows]
+    codes = idx.codes[rows]
+    key = (sessions - sessions[0]) * len(idx.albums) + codes
+    _, first, pair = np.unique(key, return_index=True, return_inverse=True)
+    last = np.zeros(len(first), dtype=np.int64)
+    np.maximum.at(last, pair, np.arange(len(rows)))
+    unique_tracks = popcount(idx.bitsets(pair, len(first), rows))
+
+    order = np.argsort(first, kind='stable')  # 依第一次出現的順序（同 groupby sort=False）
+    first, last, unique_tracks = first[order], last[order], unique_tracks[order]
+    albums = idx.albums.iloc[codes[first]]
+    local_time = store.plays['local_time'].to_numpy()
+    df = pd.DataFrame({
+        'album_id': albums['album_id'].to_numpy(),
+        'album': albums['album'].to_numpy(),
+        'main_artists': albums['main_artists'].to_numpy(),
+        'session_start': local_time[rows[first]],
+        'session_end': local_time[rows[last]],
+        'unique_tracks': unique_tracks,
+        'total_tracks': albums['total_tracks'].to_numpy()
+    })
+    df['duration_minutes'] = (df['session_end'] - df['session_start']).dt.total_seconds() / 60
+    return df[columns]
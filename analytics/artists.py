@@ -0,0 +1,59 @@
+"""
+多位歌手合併成 'Artist_1, Artist_2'：不用 groupby + Python lambda
+
+歌手名稱先 factorize 成類別代碼，依 key 穩定排序後算出每列是該 key 的第幾位歌手，
+第 k 位歌手一次接上所有 key（k 通常 <= 3），每一步都是整個陣列的運算。
+ArtistTable 以 catalog 代碼為 index 存好每首歌合併後的名稱（artist 字典的 id），
+每個 catalog 版本只建一次，之後合併歌手只是陣列 indexing（join）。
+"""
+import numpy as np, pandas as pd
+from analytics.names import dictionaries
+from analytics.play_store import PlayStore
+
+ARTIST_SEP = ', '
+
+
+def join_artists(keys: np.ndarray, artists, n_keys: int, sep: str = ARTIST_SEP) -> np.ndarray:
+    """
+    keys: 每列的 key（0 ~ n_keys-1）；artists: 每列的歌手（NaN 會被略過）
+    回傳長度 n_keys 的 object 陣列，同一個 key 的歌手依原本的列順序用 sep 連接，沒有歌手的為 ''
+    """
+    artists = pd.Series(artists).reset_index(drop=True)
+    valid = artists.notna().to_numpy()
+    keys = np.asarray(keys)[valid]
+    codes, names = pd.factorize(artists[valid])
+    names = np.asarray(names, dtype=object)
+
+    order = np.argsort(keys, kind='stable')
+    keys, codes = keys[order], codes[order]
+    rank = np.arange(len(keys)) - np.searchsorted(keys, keys, side='left')  # 同一個 key 的第幾位歌手
+
+    out = np.full(n_keys, '', dtype=object)
+    for k in range(int(rank.max()) + 1 if len(rank) else 0):
+        at = rank == k
+        out[keys[at]] = names[codes[at]] if k == 0 else out[keys[at]] + sep + names[codes[at]]
+    return out
+
+
+class ArtistTable:
+    def __init__(self, store: PlayStore):
+        """catalog 代碼 -> 合併後的歌手（依 track_artists 的順序，不在 catalog 裡的歌略過）"""
+        artists = dictionaries['artist']
+        codes = store.catalog.codes(store.track_artists['track_id'])
+        keep = codes >= 0
+        self.track_ids = store.catalog.track_ids
+        joined = join_artists(codes[keep], artists.decode(store.track_artists['artist'].to_numpy()[keep]),
+                              len(store.catalog))
+        self.joined = artists.encode(joined)
+        self.joined.flags.writeable = False
+
+    def append(self, plays: pd.DataFrame, store: PlayStore) -> 'ArtistTable':
+        """只多了 plays：catalog 沒變就沿用（新的未知 track 會讓 catalog 變長，那就重建）"""
+        return self if np.array_equal(store.catalog.track_ids, self.track_ids) else ArtistTable(store)
+
+    def lookup(self, codes: np.ndarray) -> np.ndarray:
+        return self.joined[codes]
+
+
+def get_artist_table(store: PlayStore) -> ArtistTable:
+    return store.derived('artist_table', ArtistTable)
@@ -0,0 +1,40 @@
+"""
+精簡的 track catalog：track_id 排序後的位置就是 int32 代碼，歌曲長度存成以代碼為 index 的陣列
+
+plays 在載入時轉成 track_code，之後的 join（歌曲長度、第一次播放時間…）都是陣列 indexing，
+不需要 DataFrame merge，也不會對每一列跑 Python。
+"""
+import numpy as np, pandas as pd
+
+COMPLETE_RATIO = 0.95  # 播放超過歌曲長度的 95% 才算聽完
+
+
+class TrackCatalog:
+    def __init__(self, tracks: pd.DataFrame, play_track_ids=None):
+        """
+        Parameters:
+        - tracks: track_id, duration_ms
+        - play_track_ids: plays 裡出現的 track_id；不在 tracks 裡的也給一個代碼（長度未知 = 0）
+        """
+        ids = tracks['track_id'].to_numpy().astype(str)
+        duration = tracks['duration_ms'].to_numpy()
+        if play_track_ids is not None:
+            unknown = np.setdiff1d(np.asarray(play_track_ids).astype(str), ids)
+            ids = np.concatenate([ids, unknown])
+            duration = np.concatenate([duration, np.zeros(len(unknown), dtype=duration.dtype)])
+
+        order = np.argsort(ids, kind='stable')
+        self.track_ids = ids[order]
+        self.duration_ms = duration[order].astype(np.int32)
+        self._index = pd.Index(self.track_ids)
+
+    def __len__(self):
+        return len(self.track_ids)
+
+    def codes(self, track_ids) -> np.ndarray:
+        """track_id -> int32 代碼，不在 catalog 裡的為 -1"""
+        return self._index.get_indexer(track_ids).astype(np.int32)
+
+    def skipped(self, codes: np.ndarray, ms_played: np.ndarray) -> np.ndarray:
+        """播放長度沒有超過歌曲長度 COMPLETE_RATIO 的 play（長度未知的不算跳過）"""
+        return ms_played < self.duration_ms[codes] * COMPLETE_RATIO
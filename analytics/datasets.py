@@ -0,0 +1,163 @@
+"""
+Process 共用的資料集 registry
+
+每個檔案只讀一次，所有 session 共用同一份（唯讀）。
+- 每次 get 只在超過 CHECK_INTERVAL 秒後才 stat 檔案
+- mtime / size 改變時才計算內容 hash，hash 不同才重新載入
+- 記錄 hit / miss 次數與載入時間，可用 stats() 查看
+"""
+import hashlib, json, logging, os, threading, time
+from dataclasses import dataclass
+from pathlib import Path
+from types import MappingProxyType
+import pandas as pd
+
+pd.options.mode.copy_on_write = True  # 讓 shallow copy 真正和共用資料隔離
+
+ROOT = Path(__file__).resolve().parent.parent
+CHECK_INTERVAL = 2.0  # 秒，slider 連續拖動時不重複 stat
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class _Entry:
+    value: object
+    loader: object
+    mtime_ns: int
+    size: int
+    digest: str
+    load_seconds: float
+    checked_at: float
+    hits: int = 0
+    misses: int = 0
+    reloads: int = 0
+
+
+def _file_digest(path: Path) -> str:
+    h = hashlib.blake2b(digest_size=16)
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def _readonly(value):
+    """回傳共用資料的唯讀 view（DataFrame 用 copy-on-write 的 shallow copy）"""
+    if isinstance(value, (pd.DataFrame, pd.Series)):
+        return value.copy(deep=False)
+    if isinstance(value, dict):
+        return MappingProxyType(value)
+    return value
+
+
+class DatasetRegistry:
+    def __init__(self, check_interval: float = CHECK_INTERVAL):
+        self.check_interval = check_interval
+        self._entries: dict[Path, _Entry] = {}
+        self._locks: dict[Path, threading.Lock] = {}
+        self._lock = threading.Lock()
+
+    def _path_lock(self, path: Path) -> threading.Lock:
+        with self._lock:
+            return self._locks.setdefault(path, threading.Lock())
+
+    def _hit(self, entry: _Entry) -> _Entry:
+        # fast path 不拿 path lock，hits 一律在 registry 的 lock 裡加（只鎖一下，不會等到別的檔案載入）
+        with self._lock:
+            entry.hits += 1
+        return entry
+
+    @staticmethod
+    def _resolve(path) -> Path:
+        path = Path(path)
+        return path if path.is_absolute() else (ROOT / path).resolve()
+
+    def get(self, path, loader=pd.read_parquet):
+        """
+        取得 path 的資料，必要時才 (重新) 載入
+
+        Parameters:
+        - path: 檔案路徑（相對路徑以 repo 根目錄為準）
+        - loader: 讀檔函式，預設 pd.read_parquet
+        """
+        return _readonly(self._entry(self._resolve(path), loader).value)
+
+    def version(self, path, loader=pd.read_parquet) -> str:
+        """檔案內容 hash，可當作下游快取的 dataset version key"""
+        return self._entry(self._resolve(path), loader).digest
+
+    def _entry(self, path: Path, loader) -> _Entry:
+        entry = self._entries.get(path)
+        now = time.monotonic()
+
+        # fast path: 剛檢查過，不碰 disk
+        if entry is not None and now - entry.checked_at < self.check_interval:
+            return self._hit(entry)
+
+        with self._path_lock(path):
+            entry = self._entries.get(path)
+            stat = os.stat(path)
+
+            if entry is not None:
+                if (stat.st_mtime_ns, stat.st_size) == (entry.mtime_ns, entry.size):
+                    entry.checked_at = now
+                    return self._hit(entry)
+
+                # mtime 變了，但內容不一定有變（e.g. touch、重新 checkout）
+                digest = _file_digest(path)
+                if digest == entry.digest:
+                    entry.mtime_ns, entry.size, entry.checked_at = stat.st_mtime_ns, stat.st_size, now
+                    return self._hit(entry)
+                loader = entry.loader
+            else:
+                digest = _file_digest(path)
+
+            t0 = time.perf_counter()
+            value = loader(path)
+            load_seconds = time.perf_counter() - t0
+
+            if entry is None:
+                entry = _Entry(value, loader, stat.st_mtime_ns, stat.st_size, digest, load_seconds, now)
+                self._entries[path] = entry
+            else:
+                entry.value, entry.digest = value, digest
+                entry.mtime_ns, entry.size, entry.checked_at = stat.st_mtime_ns, stat.st_size, now
+                entry.load_seconds = load_seconds
+                entry.reloads += 1
+            entry.misses += 1
+            logger.info("loaded %s in %.1f ms", path.relative_to(ROOT) if path.is_relative_to(ROOT) else path,
+                        load_seconds * 1000)
+            return entry
+
+    def stats(self) -> pd.DataFrame:
+        """每個檔案的 hit / miss / reload 次數與最近一次載入時間"""
+        rows = [{
+            'file': str(p.relative_to(ROOT)) if p.is_relative_to(ROOT) else str(p),
+            'hits': e.hits,
+            'misses': e.misses,
+            'reloads': e.reloads,
+            'load_ms': round(e.load_seconds * 1000, 2),
+            'version': e.digest[:8]
+        } for p, e in self._entries.items()]
+        return pd.DataFrame(rows, columns=['file', 'hits', 'misses', 'reloads', 'load_ms', 'version'])
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+registry = DatasetRegistry()
+
+
+def read_parquet(path) -> pd.DataFrame:
+    return registry.get(path, pd.read_parquet)
+
+
+def _load_json(path):
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def read_json(path):
+    return registry.get(path, _load_json)
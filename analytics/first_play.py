@@ -0,0 +1,90 @@
+"""
+每首歌第一次被播放的時間（新歌比例用）
+
+store/first_played.parquet 存 track_id -> 第一次播放時間，依 track_id 排序，
+append_plays 寫入新 plays 時順便合併更新（只看新的 plays，不重掃歷史）。
+「這筆 play 是不是新歌」= 對排序好的 track_id 做 searchsorted 查出第一次播放時間再比較，
+任何區間、任何 slot 都不需要往前掃描。
+"""
+import numpy as np, pandas as pd
+import pyarrow as pa, pyarrow.parquet as pq
+
+FIRST_PLAYED_FILE = 'first_played.parquet'
+NOT_PLAYED = np.iinfo(np.int64).max  # 沒播放過的 track
+
+
+def _ns(played_at: pd.Series) -> np.ndarray:
+    return played_at.to_numpy(dtype='datetime64[ns]').view('int64')
+
+
+class FirstPlayIndex:
+    """依 track_id 排序的 (track_ids, first_ts) 兩個陣列；last_ts = 已經併入的最後一筆 play"""
+
+    def __init__(self, track_ids: np.ndarray, first_ts: np.ndarray, last_ts: int):
+        self.track_ids = track_ids
+        self.first_ts = first_ts
+        self.last_ts = last_ts
+
+    def __len__(self):
+        return len(self.track_ids)
+
+    @classmethod
+    def empty(cls) -> 'FirstPlayIndex':
+        return cls(np.array([], dtype=str), np.array([], dtype=np.int64), np.iinfo(np.int64).min)
+
+    @classmethod
+    def from_plays(cls, plays: pd.DataFrame) -> 'FirstPlayIndex':
+        return cls.empty().merge(plays)
+
+    def merge(self, plays: pd.DataFrame) -> 'FirstPlayIndex':
+        """併入 plays（不需要排序、可以比 last_ts 早），回傳新的 index"""
+        if len(plays) == 0:
+            return self
+        ts = _ns(plays['played_at'])
+        ids = np.concatenate([self.track_ids, plays['track_id'].to_numpy().astype(str)])
+        ts = np.concatenate([self.first_ts, ts])
+
+        # 依 (track_id, ts) 排序後每個 track_id 取第一筆
+        order = np.argsort(ts, kind='stable')
+        order = order[np.argsort(ids[order], kind='stable')]
+        ids, ts = ids[order], ts[order]
+        first = np.r_[True, ids[1:] != ids[:-1]]
+        return FirstPlayIndex(ids[first], ts[first], max(self.last_ts, int(ts.max())))
+
+    def append(self, plays: pd.DataFrame, store=None) -> 'FirstPlayIndex':
+        """只併入 last_ts 之後的 plays（plays 依時間排序；由 PlayStore.inherit 呼叫）"""
+        return self.merge(plays.iloc[np.searchsorted(_ns(plays['played_at']), self.last_ts, side='right'):])
+
+    def lookup(self, track_ids) -> np.ndarray:
+        """每個 track_id 第一次播放的時間（UTC epoch ns），沒播放過為 NOT_PLAYED"""
+        track_ids = np.asarray(track_ids).astype(str)
+        if len(self.track_ids) == 0:
+            return np.full(len(track_ids), NOT_PLAYED)
+        pos = np.searchsorted(self.track_ids, track_ids).clip(max=len(self.track_ids) - 1)
+        return np.where(self.track_ids[pos] == track_ids, self.first_ts[pos], NOT_PLAYED)
+
+    def is_new(self, track_ids, played_at: pd.Series) -> np.ndarray:
+        return self.lookup(track_ids) == _ns(played_at)
+
+    # ===== 存檔 =====
+    def save(self, path):
+        table = pa.table({
+            'track_id': pa.array(self.track_ids, pa.string()),
+            'first_played': pa.array(self.first_ts, pa.timestamp('ns', tz='UTC'))
+        }).replace_schema_metadata({'last_ts': str(self.last_ts)})
+        pq.write_table(table, path)
+
+    @classmethod
+    def load(cls, path) -> 'FirstPlayIndex':
+        table = pq.read_table(path)
+        return cls(table['track_id'].to_numpy(zero_copy_only=False).astype(str),
+                   table['first_played'].cast(pa.int64()).to_numpy(),
+                   int(table.schema.metadata[b'last_ts']))
+
+
+def get_first_play_index(store) -> FirstPlayIndex:
+    """store 的 first-play index：有存檔就從存檔接著併入，沒有才從 plays 建"""
+    def build(s):
+        base = s.first_played if s.first_played is not None else FirstPlayIndex.empty()
+        return base.append(s.plays)
+    return store.derived('first_play_index', build)
@@ -0,0 +1,159 @@
+"""
+按讚 vs 播放落差：區間內每首歌的播放次數，拆成「有按讚」/「沒按讚」兩組
+輸出欄位和 data/page4/ 的 snapshot 相同
+
+GapJoin 把按讚 / 沒按讚的切分做成 track 代碼上的 searchsorted join，任何聆聽區間都能即時算。
+GapIndex 在每個 dataset 版本（snapshot 檔案或 store 版本 + 日期區間）只建一次：
+播放次數排序好，Top % / Bottom % 門檻直接查位置；三個區塊的候選清單也預先排序，
+調整門檻只是 searchsorted 後取一段 slice。
+"""
+import threading
+from collections import OrderedDict
+import numpy as np, pandas as pd
+from analytics.artists import get_artist_table
+from analytics.liked_songs import LikedSongs, get_liked_store, liked_version
+from analytics.names import MISSING
+from analytics.play_store import PlayStore
+
+
+class GapJoin:
+    """
+    以 track 代碼做 join：
+    - liked 的代碼排序好存成陣列（semi-join：有按讚且有播放 -> 按讚但少聽 / 回味經典）
+    - 其餘有播放的代碼就是 anti-join（有播放但沒按讚 -> 常聽未按讚）
+    代碼 -> track_id / track / artist 的顯示欄位也是陣列，只有輸出時才 gather
+
+    Parameters:
+    - track_ids: 代碼 -> track_id（代碼 = 位置）
+    - tracks, artists: 代碼 -> 歌名、歌手（names.py 的 id；多位歌手已合併成一個名稱）
+    - liked: 按讚的歌
+    """
+
+    def __init__(self, track_ids: np.ndarray, tracks: np.ndarray, artists: np.ndarray, liked: LikedSongs):
+        self.track_ids, self.tracks, self.artists = track_ids, tracks, artists
+        codes = pd.Index(track_ids).get_indexer(liked.track_ids)
+        keep = codes >= 0  # 按讚但從沒出現在播放資料裡的歌不會被 join 到
+        order = np.argsort(codes[keep], kind='stable')
+        self.liked_codes = codes[keep][order]
+        self.liked_added = liked.added_at.tz_localize(None).to_numpy()[keep][order]
+
+    def split(self, codes: np.ndarray, counts: np.ndarray) -> tuple[pd.DataFrame, pd.DataFrame, pd.DataFrame]:
+        """
+        codes / counts: 區間內有播放的代碼（遞增）與播放次數
+        回傳 (counts, liked, not_liked)，欄位同 page4 的 df / df_forgotten / df_frequent_not_liked
+        """
+        pos = np.searchsorted(self.liked_codes, codes).clip(max=max(len(self.liked_codes) - 1, 0))
+        is_liked = (self.liked_codes[pos] == codes) if len(self.liked_codes) else np.zeros(len(codes), bool)
+
+        def rows(mask):
+            c = codes[mask]
+            return {'track_id': self.track_ids[c], 'track': self.tracks[c], 'count': counts[mask]}
+
+        liked = pd.DataFrame({**rows(is_liked), 'added_at': self.liked_added[pos[is_liked]],
+                              'artist': self.artists[codes[is_liked]]})
+        not_liked = pd.DataFrame({**rows(~is_liked), 'artist': self.artists[codes[~is_liked]]})
+        return pd.DataFrame({'count': counts, 'track_id': self.track_ids[codes]}), liked, not_liked
+
+
+def get_store_gap_lists(store: PlayStore, start_date, end_date) -> tuple[pd.DataFrame, pd.DataFrame, pd.DataFrame]:
+    """區間內的 (counts, liked, not_liked)；join 索引依 store 版本 + 按讚資料版本快取"""
+    def build(s):
+        catalog = s.catalog
+        tracks = s.tracks.set_index('track_id')['track'].reindex(catalog.track_ids, fill_value=MISSING).to_numpy()
+        return GapJoin(catalog.track_ids.astype(object), tracks, get_artist_table(s).joined, get_liked_store())
+    join = store.derived(f'gap_join:{liked_version()}', build)
+
+    lo, hi = store.bounds(start_date, end_date)
+    counts = np.bincount(store.plays['track_code'].to_numpy()[lo:hi], minlength=len(store.catalog))
+    codes = np.flatnonzero(counts)
+    return join.split(codes, counts[codes])
+
+
+def get_snapshot_gap_lists(counts: pd.DataFrame, *named: pd.DataFrame) -> tuple[pd.DataFrame, pd.DataFrame, pd.DataFrame]:
+    """
+    demo snapshot：播放次數用 df.parquet，歌名 / 歌手取自 snapshot 的清單，
+    有按讚 / 沒按讚則用目前的按讚資料重新切（新的按讚會反映出來）
+    """
+    names = pd.concat([df[['track_id', 'track', 'artist']] for df in named]).drop_duplicates('track_id')
+    names = names.set_index('track_id').reindex(np.sort(counts['track_id'].to_numpy().astype(str)), fill_value=MISSING)
+    join = GapJoin(names.index.to_numpy(dtype=object), names['track'].to_numpy(), names['artist'].to_numpy(),
+                   get_liked_store())
+    codes = pd.Index(names.index).get_indexer(counts['track_id'])
+    order = np.argsort(codes)
+    return join.split(codes[order], counts['count'].to_numpy()[order])
+
+
+def quantile_position(q: float, n: int) -> int:
+    """
+    Series.quantile(q, interpolation='lower') 在排序後陣列中的位置
+    q 是 [0, 1] 的比例（不是 0–100）；先 ×100 再 /100 是照 np.percentile 內部的浮點運算，
+    讓 q * (n - 1) 剛好落在整數附近時取到和 Series.quantile 一樣的位置
+    """
+    return int(np.floor(np.asarray(q * 100) / 100 * (n - 1)))
+
+
+class GapIndex:
+    """
+    Parameters:
+    - counts: 每首歌的播放次數（count, track_id）
+    - forgotten / frequent / long: 三個區塊的候選（liked / not_liked / liked）
+    """
+
+    def __init__(self, counts: pd.DataFrame, forgotten: pd.DataFrame, frequent: pd.DataFrame, long: pd.DataFrame):
+        self.sorted_counts = np.sort(counts['count'].to_numpy())
+        # 按讚但少聽、常聽未按讚：依播放次數由多到少（顯示順序），門檻篩選 = 取尾段 / 前段
+        self._forgotten = forgotten.sort_values('count', ascending=False, kind='stable').reset_index(drop=True)
+        self._frequent = frequent.sort_values('count', ascending=False, kind='stable').reset_index(drop=True)
+        self._forgotten_key = -self._forgotten['count'].to_numpy()
+        self._frequent_key = -self._frequent['count'].to_numpy()
+        # 回味經典：依按讚時間（顯示順序），「很久以前」= 前段
+        self._long = long.sort_values('added_at', kind='stable').reset_index(drop=True)
+        self._long_added = self._long['added_at'].to_numpy(dtype='datetime64[ns]')
+        self._long_count = self._long['count'].to_numpy()
+
+    def __len__(self):
+        return len(self.sorted_counts)
+
+    def threshold(self, q: float) -> int:
+        """播放次數的 q 分位數（lower）"""
+        if len(self.sorted_counts) == 0:
+            return 0
+        return int(self.sorted_counts[quantile_position(q, len(self.sorted_counts))])
+
+    def count_at_least(self, threshold: int) -> int:
+        return len(self.sorted_counts) - int(np.searchsorted(self.sorted_counts, threshold, side='left'))
+
+    def forgotten(self, bottom: float) -> pd.DataFrame:
+        """播放次數 <= bottom 分位數的按讚歌曲（播放次數由多到少）"""
+        i = np.searchsorted(self._forgotten_key, -self.threshold(bottom), side='left')
+        return self._forgotten.iloc[i:]
+
+    def frequent(self, top: float) -> pd.DataFrame:
+        """播放次數 >= top 分位數的未按讚歌曲（播放次數由多到少）"""
+        i = np.searchsorted(self._frequent_key, -self.threshold(top), side='right')
+        return self._frequent.iloc[:i]
+
+    def long(self, top: float, cutoff) -> pd.DataFrame:
+        """cutoff 之前按讚、播放次數 >= top 分位數的歌（依按讚時間排序）"""
+        i = np.searchsorted(self._long_added, np.datetime64(pd.Timestamp(cutoff), 'ns'), side='left')
+        return self._long.iloc[:i][self._long_count[:i] >= self.threshold(top)]
+
+
+MAX_CACHED_INDEXES = 8
+_indexes = OrderedDict()
+_indexes_lock = threading.Lock()
+
+
+def get_gap_index(key, build) -> GapIndex:
+    """key = dataset 版本（+ 日期區間）；同一個 key 只建一次（保留最近 MAX_CACHED_INDEXES 個）"""
+    with _indexes_lock:
+        index = _indexes.get(key)
+        if index is not None:
+            _indexes.move_to_end(key)
+            return index
+    index = build()
+    with _indexes_lock:
+        _indexes[key] = index
+        if len(_indexes) > MAX_CACHED_INDEXES:
+            _indexes.popitem(last=False)
+    return index
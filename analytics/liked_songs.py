@@ -0,0 +1,69 @@
+"""
+按讚的歌：track_id + added_at（UTC, tz-aware），載入時依 added_at 排序一次
+
+data/liked.parquet 存在時優先使用（大型曲庫建議轉成 parquet），否則讀 data/liked.csv，
+都用 pyarrow 讀成有型別的欄位。由 dataset registry 第一次用到時才載入（每個檔案一把鎖），
+之後所有 session 共用同一份唯讀資料；時間區間的按讚數是 added_at 上的 binary search。
+"""
+import numpy as np, pandas as pd
+import pyarrow.csv as pacsv, pyarrow.parquet as pq
+from analytics.datasets import ROOT, registry
+
+LIKED_PARQUET = ROOT / "data" / "liked.parquet"
+LIKED_CSV = ROOT / "data" / "liked.csv"
+
+
+def _utc_ns(t) -> int:
+    """naive 時間視為 UTC"""
+    t = pd.Timestamp(t)
+    return (t.tz_localize('UTC') if t.tzinfo is None else t.tz_convert('UTC')).value
+
+
+class LikedSongs:
+    def __init__(self, track_ids: np.ndarray, added_at: pd.DatetimeIndex):
+        order = np.argsort(added_at.asi8, kind='stable')
+        self.track_ids = np.asarray(track_ids, dtype=object)[order]
+        self.added_at = added_at[order].as_unit('ns')
+        self._ts = self.added_at.asi8
+        self.track_ids.flags.writeable = False
+
+    def __len__(self):
+        return len(self.track_ids)
+
+    @classmethod
+    def load(cls, path) -> 'LikedSongs':
+        columns = ['track_id', 'added_at']
+        if str(path).endswith('.parquet'):
+            table = pq.read_table(path, columns=columns)
+        else:
+            table = pacsv.read_csv(path, convert_options=pacsv.ConvertOptions(include_columns=columns))
+        added_at = pd.DatetimeIndex(pd.to_datetime(table['added_at'].to_pandas(), utc=True))
+        return cls(table['track_id'].to_numpy(zero_copy_only=False), added_at)
+
+    def bounds(self, start, end) -> tuple[int, int]:
+        """start <= added_at <= end 的 [lo, hi)"""
+        lo = np.searchsorted(self._ts, _utc_ns(start), side='left')
+        hi = np.searchsorted(self._ts, _utc_ns(end), side='right')
+        return int(lo), int(max(lo, hi))
+
+    def count_between(self, start, end) -> int:
+        """start ~ end（含頭含尾）之間按讚的數量"""
+        lo, hi = self.bounds(start, end)
+        return hi - lo
+
+    def frame(self) -> pd.DataFrame:
+        """track_id, added_at（UTC，naive；和 play store 的欄位一致）"""
+        return pd.DataFrame({'track_id': self.track_ids, 'added_at': self.added_at.tz_localize(None)})
+
+
+def _liked_path():
+    return LIKED_PARQUET if LIKED_PARQUET.exists() else LIKED_CSV
+
+
+def get_liked_store() -> LikedSongs:
+    return registry.get(_liked_path(), loader=LikedSongs.load)
+
+
+def liked_version() -> str:
+    """按讚資料的版本（檔案內容 hash），有新的按讚時會改變"""
+    return registry.version(_liked_path(), loader=LikedSongs.load)
@@ -0,0 +1,85 @@
+"""
+共用的名稱字典：track / artist / album 名稱 -> int32 id
+
+所有資料集（page1 / page3 / page4 的 snapshot、play store 的 tracks / albums / track_artists）
+載入時名稱欄位就換成 int32 id，groupby / join 都在整數上做；
+只有真的要畫出來的部分（top-N bar、cards、hover text）才 decode 成字串。
+
+字典只會往後加，同一個名稱在 process 裡的 id 永遠不變，不同資料集之間也共用同一組 id。
+id 不寫進檔案，所以不需要跨 process 一致。
+"""
+import threading
+import numpy as np, pandas as pd
+from analytics.datasets import registry
+
+MISSING = -1  # NaN / None
+
+# 欄位 -> 字典；main_artists 和 page4 合併後的 artist（'A, B'）都放在 artist 字典
+NAME_COLUMNS = {'track': 'track', 'artist': 'artist', 'album': 'album', 'main_artists': 'artist'}
+
+
+class NameDictionary:
+    def __init__(self):
+        self._names = np.empty(0, dtype=object)
+        self._index = pd.Index(self._names)
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._names)
+
+    def encode(self, values) -> np.ndarray:
+        """名稱 -> int32 id，沒看過的名稱依出現順序加在最後面；NaN 為 MISSING"""
+        values = pd.Series(values, dtype=object).reset_index(drop=True)
+        codes = self._index.get_indexer(values)
+        new = (codes < 0) & values.notna().to_numpy()
+        if new.any():
+            with self._lock:
+                unseen = pd.unique(values[new])
+                unseen = unseen[self._index.get_indexer(unseen) < 0]  # 其他 thread 可能剛加過
+                names = np.concatenate([self._names, unseen.astype(object)])
+                self._index = pd.Index(names)
+                self._names = names
+            codes = self._index.get_indexer(values)
+        return codes.astype(np.int32)
+
+    def decode(self, codes) -> np.ndarray:
+        """int32 id -> 名稱（object 陣列），MISSING 為 None"""
+        codes = np.asarray(codes, dtype=np.int64)
+        names = self._names
+        out = names[np.clip(codes, 0, None)] if len(names) else np.full(len(codes), None, dtype=object)
+        return np.where(codes >= 0, out, None)
+
+
+dictionaries = {kind: NameDictionary() for kind in ('track', 'artist', 'album')}
+
+
+def encode_names(df: pd.DataFrame) -> pd.DataFrame:
+    """名稱欄位換成 int32 id（已經是 id 的欄位不動）"""
+    cols = {c: kind for c, kind in NAME_COLUMNS.items()
+            if c in df.columns and not pd.api.types.is_integer_dtype(df[c])}
+    if not cols:
+        return df
+    return df.assign(**{c: dictionaries[kind].encode(df[c]) for c, kind in cols.items()})
+
+
+def decode_names(df: pd.DataFrame) -> pd.DataFrame:
+    """要顯示之前才呼叫：id 欄位換回名稱（只 decode 傳進來的這幾列）"""
+    cols = {c: kind for c, kind in NAME_COLUMNS.items()
+            if c in df.columns and pd.api.types.is_integer_dtype(df[c])}
+    if not cols:
+        return df
+    return df.assign(**{c: dictionaries[kind].decode(df[c].to_numpy()) for c, kind in cols.items()})
+
+
+def _load_encoded(path) -> pd.DataFrame:
+    return encode_names(pd.read_parquet(path))
+
+
+def read_encoded(path) -> pd.DataFrame:
+    """同 datasets.read_parquet，但名稱欄位已經是 int32 id"""
+    return registry.get(path, _load_encoded)
+
+
+def encoded_version(path) -> str:
+    """read_encoded 的檔案版本（同一個檔案要用同一個 loader 註冊）"""
+    return registry.version(path, loader=_load_encoded)
@@ -0,0 +1,102 @@
+"""
+Overview 頁面的指標：由 PlayStore 的時間區間 slice 即時計算，
+輸出欄位和 data/page1/ 的 snapshot 相同
+"""
+import numpy as np, pandas as pd
+from analytics.names import MISSING
+from analytics.play_store import PlayStore
+from analytics.rollup import get_rollup
+from analytics.streaks import get_artist_bitmap
+from analytics.repeats import get_repeat_runs
+from analytics.sessions import DEFAULT_GAP_MINUTES
+from analytics.topn import top_n
+from visualizations.overview import get_heatmap_date_range
+
+
+def get_unique_values(plays: pd.DataFrame, store: PlayStore, start_date, end_date) -> pd.DataFrame:
+    """總聆聽時數、不重複歌曲/藝人/專輯（格式同 df_unique_value）"""
+    artists = store.track_artists.loc[store.track_artists['track_id'].isin(plays['track_id'].unique()), 'artist']
+    total = get_rollup(store).total(start_date, end_date)
+    return pd.DataFrame([{
+        'total_duration': f"{total / 3600:.1f} hrs",
+        'unique_tracks': str(plays['track_id'].nunique()),
+        'unique_artists': str(artists.nunique()),
+        'unique_albums': str(plays['album_id'].nunique())
+    }])
+
+
+def get_context_texts(plays: pd.DataFrame) -> dict:
+    """聆聽來源比例（格式同 texts.json）"""
+    if len(plays) == 0:
+        return {'primary_des': '-', 'full_des': '-'}
+    share = plays['context_type'].value_counts(normalize=True)
+    return {
+        'primary_des': f"{share.index[0]}: {share.iloc[0]:.0%}",
+        'full_des': ', '.join(f"{k} {v:.0%}" for k, v in share.items())
+    }
+
+
+def get_duration_per_day(store: PlayStore, start_date, end_date) -> pd.DataFrame:
+    """
+    calendar heatmap 用：補滿 heatmap 範圍內每一天（格式同 df_duration_per_day）
+    只有所選區間內的日期有值，其他補 0
+    """
+    heatmap_start, heatmap_end = get_heatmap_date_range(start_date, end_date)
+    days = pd.date_range(heatmap_start, heatmap_end, freq='D')
+
+    daily = get_rollup(store).daily_series(start_date, end_date)
+    df = pd.DataFrame({'day': days})
+    df['duration'] = daily.reindex(days, fill_value=0.0).to_numpy()
+    df['week'] = (np.arange(len(days)) + days[0].weekday()) // 7
+    df['year'] = df['day'].dt.year
+    df['month'] = df['day'].dt.month
+    df['weekday'] = df['day'].dt.weekday
+    df['hours'] = df['duration'] / 3600
+    return df
+
+
+def get_top_entities(store: PlayStore, genre: str, start_date, end_date, n: int = 10) -> pd.DataFrame:
+    """依總時長排序的前 n 名 artist / track / album（格式同 df1 / df2 / df3）"""
+    return top_n(get_rollup(store), genre, start_date, end_date, n)
+
+
+# ===== highlight cards =====
+def get_highest_duration_day(store: PlayStore, start_date, end_date) -> pd.DataFrame:
+    daily = get_rollup(store).daily_series(start_date, end_date)
+    return pd.DataFrame([{'play_date': daily.idxmax(), 'duration': daily.max()}])
+
+
+def get_highest_artist_day(plays: pd.DataFrame, store: PlayStore) -> pd.DataFrame:
+    daily = store.artist_plays(plays).groupby(['play_date', 'artist'])['duration'].sum()
+    if len(daily) == 0:  # 區間內的歌都沒有歌手資料
+        return pd.DataFrame([{'play_date': plays['play_date'].min(), 'artist': MISSING, 'duration': 0.0}])
+    play_date, artist = daily.idxmax()
+    return pd.DataFrame([{'play_date': play_date, 'artist': artist, 'duration': daily.max()}])
+
+
+def get_track_repeat_max(store: PlayStore, start_date, end_date,
+                         gap_minutes: float = DEFAULT_GAP_MINUTES) -> pd.DataFrame:
+    """同一 session 內同一首歌連續播放最多次"""
+    runs = get_repeat_runs(store, start_date, end_date, 2, gap_minutes)
+    if len(runs) == 0:  # 區間內沒有任何重複播放
+        runs = get_repeat_runs(store, start_date, end_date, 1, gap_minutes)
+    return runs.iloc[[0]].reset_index(drop=True)
+
+
+def get_artist_streaks(store: PlayStore, start_date, end_date) -> tuple[pd.DataFrame, pd.DataFrame]:
+    """
+    回傳 (artist_streak_consecutive, artist_total_days)
+    - 最多連續幾天聆聽同一位藝人
+    - 聆聽天數最多的藝人（不需連續）
+    """
+    bitmap = get_artist_bitmap(store)
+    streaks = bitmap.longest_streaks(start_date, end_date)
+    total = bitmap.total_days(start_date, end_date)
+    if len(streaks) == 0 or len(total) == 0:  # 區間內的歌都沒有歌手資料
+        day = pd.Timestamp(start_date)
+        return (pd.DataFrame([{'artist': MISSING, 'consecutive_days': 0, 'streak_start': day, 'streak_end': day}]),
+                pd.DataFrame([{'artist': MISSING, 'total_days': 0}]))
+
+    best = streaks.sort_values(['consecutive_days', 'streak_end'], ascending=[False, False]).iloc[[0]]
+    most = total.sort_values('total_days', ascending=False, kind='stable').iloc[[0]]
+    return best.reset_index(drop=True), most.reset_index(drop=True)
@@ -0,0 +1,35 @@
+"""
+一天的時段切分：每個時段的起始小時（當地時間），依 TIME_PERIODS 的順序
+
+時段代碼只由 local_hour（int8）查 24 格的對照表得到，
+改變分界不需要重新轉換時間，只要重新查表。
+"""
+import numpy as np
+
+TIME_PERIODS = ['Late Night', 'Morning', 'Afternoon', 'Evening']
+DEFAULT_PERIOD_STARTS = (0, 6, 12, 18)
+
+
+def period_lut(starts=DEFAULT_PERIOD_STARTS) -> np.ndarray:
+    """
+    小時 (0-23) -> 時段代碼 的對照表
+    每個小時屬於「往前數最近的一個起始小時」的時段，可以跨午夜（例如深夜 23 點開始）
+    """
+    starts = np.asarray(starts, dtype=np.int64)
+    if len(starts) != len(TIME_PERIODS) or len(set(starts.tolist())) != len(starts) \
+            or starts.min() < 0 or starts.max() > 23:
+        raise ValueError(f"period starts must be {len(TIME_PERIODS)} distinct hours in 0-23, got {starts.tolist()}")
+    since = (np.arange(24)[:, None] - starts[None, :]) % 24
+    return since.argmin(axis=1).astype(np.int8)
+
+
+def period_codes(hours: np.ndarray, starts=DEFAULT_PERIOD_STARTS) -> np.ndarray:
+    """int8 的當地小時 -> int8 的時段代碼"""
+    return period_lut(starts)[hours]
+
+
+def describe_periods(starts=DEFAULT_PERIOD_STARTS) -> dict:
+    """{時段: 'HH:00-HH:00'}，給頁面說明用"""
+    order = np.argsort(starts)
+    ends = np.roll(np.asarray(starts)[order], -1)
+    return {TIME_PERIODS[i]: f"{starts[i]:02d}:00-{end:02d}:00" for i, end in zip(order, ends)}
@@ -0,0 +1,222 @@
+"""
+本地 play-event store，取代原本的 Supabase
+
+store/
+  plays/YYYY-MM.parquet   played_at (UTC), track_id, ms_played, context_type；每個檔案依 played_at 排序
+  tracks.parquet          track_id, track, album_id, track_number, duration_ms
+  albums.parquet          album_id, album, total_tracks, main_artists
+  track_artists.parquet   track_id, artist（多位歌手 = 多列）
+  first_played.parquet    track_id, first_played（append_plays 時更新，見 first_play.py）
+
+載入後所有 plays 依時間排序成一個 DataFrame，時間區間查詢用 searchsorted
+找出 [lo, hi) 再 iloc，不做整張表的 boolean scan。
+
+track_id 在載入時轉成 int32 的 track_code（見 catalog.py）；
+歌名 / 專輯 / 藝人名稱轉成共用字典的 int32 id（見 names.py），顯示時才 decode。
+時區在載入時套用一次：local_time / play_date 之外，另外存 int8 的
+local_weekday（0 = Sun）、local_hour、local_period（預設時段分界），
+之後的分析都不需要再做時間轉換。
+"""
+import os, threading
+from datetime import date
+from pathlib import Path
+import numpy as np, pandas as pd
+from analytics.catalog import TrackCatalog
+from analytics.datasets import ROOT, registry
+from analytics.first_play import FIRST_PLAYED_FILE, FirstPlayIndex
+from analytics.names import encode_names
+from analytics.periods import period_codes
+
+STORE_DIR = Path(os.getenv("PLAY_STORE_DIR", ROOT / "data" / "store"))
+TIMEZONE = os.getenv("PLAY_STORE_TZ", "Asia/Taipei")
+TIMEZONES = list(dict.fromkeys([TIMEZONE, "Asia/Taipei", "Asia/Tokyo", "Europe/London",
+                                "America/New_York", "America/Los_Angeles", "UTC"]))
+
+# 沒有 store 時（靜態 demo）使用的固定區間
+DEMO_START = date(2025, 10, 25)
+DEMO_END = date(2026, 1, 23)
+
+PLAY_COLUMNS = ['played_at', 'track_id', 'ms_played', 'context_type']
+
+
+class PlayStore:
+    def __init__(self, plays: pd.DataFrame, tracks: pd.DataFrame, albums: pd.DataFrame,
+                 track_artists: pd.DataFrame, version: str, catalog_version: str = '',
+                 timezone: str = TIMEZONE, first_played: FirstPlayIndex = None):
+        tracks, albums, track_artists = (encode_names(df) for df in (tracks, albums, track_artists))
+        plays = plays.sort_values('played_at', kind='stable').reset_index(drop=True)
+        plays = (plays
+                 .merge(tracks, on='track_id', how='left')
+                 .merge(albums, on='album_id', how='left'))
+
+        local_time = plays['played_at'].dt.tz_convert(timezone).dt.tz_localize(None)
+        plays['local_time'] = local_time
+        plays['play_date'] = local_time.dt.normalize()
+        plays['duration'] = plays['ms_played'] / 1000
+
+        self.catalog = TrackCatalog(tracks, plays['track_id'].unique())
+        plays['track_code'] = self.catalog.codes(plays['track_id'])
+
+        hours = local_time.to_numpy(dtype='datetime64[h]').view('int64')
+        plays['local_weekday'] = ((hours // 24 + 4) % 7).astype(np.int8)  # 1970-01-01 是星期四
+        plays['local_hour'] = (hours % 24).astype(np.int8)
+        plays['local_period'] = period_codes(plays['local_hour'].to_numpy())
+
+        self.plays = plays
+        self.tracks = tracks
+        self.albums = albums
+        self.track_artists = track_artists
+        self.version = version
+        self.catalog_version = catalog_version
+        self.timezone = timezone
+        self.first_played = first_played
+        self.ts = plays['played_at'].to_numpy(dtype='datetime64[ns]').view('int64')
+        self._derived = {}
+        self._derived_lock = threading.RLock()  # 衍生索引可能依賴其他衍生索引
+
+    def __len__(self):
+        return len(self.plays)
+
+    def derived(self, name: str, build):
+        """由 store 內容建出的索引（rollup 等），每個 store 版本只建一次"""
+        obj = self._derived.get(name)
+        if obj is None:
+            with self._derived_lock:
+                obj = self._derived.get(name)
+                if obj is None:
+                    obj = self._derived[name] = build(self)
+        return obj
+
+    def inherit(self, previous: 'PlayStore'):
+        """
+        新版本只是在舊版本後面多了 plays 時，沿用舊的衍生索引，
+        有 append(plays, store) 的索引只併入新增的 plays
+        """
+        n = len(previous)
+        if n > len(self) or not np.array_equal(self.ts[:n], previous.ts):
+            return
+        new_plays = self.plays.iloc[n:]
+        for name, obj in previous._derived.items():
+            if hasattr(obj, 'append'):
+                self._derived[name] = obj.append(new_plays, self)
+
+    def _to_utc_ns(self, d) -> int:
+        """當地日期 00:00 轉成 UTC epoch ns"""
+        return pd.Timestamp(d).tz_localize(self.timezone).tz_convert('UTC').value
+
+    def bounds(self, start_date, end_date) -> tuple[int, int]:
+        """
+        start_date ~ end_date（當地日期，含頭含尾）對應的 [lo, hi) row index
+        played_at 已排序，用 binary search
+        """
+        lo_ns = self._to_utc_ns(start_date)
+        hi_ns = self._to_utc_ns(pd.Timestamp(end_date) + pd.Timedelta(days=1))
+        lo, hi = np.searchsorted(self.ts, [lo_ns, hi_ns], side='left')
+        return int(lo), int(hi)
+
+    def slice(self, start_date, end_date) -> pd.DataFrame:
+        lo, hi = self.bounds(start_date, end_date)
+        return self.plays.iloc[lo:hi]
+
+    def artist_plays(self, plays: pd.DataFrame) -> pd.DataFrame:
+        """每位歌手一列（多歌手的歌會出現多次）"""
+        return plays.merge(self.track_artists, on='track_id', how='inner')
+
+    def date_range(self) -> tuple[date, date]:
+        if len(self.plays) == 0:
+            return DEMO_START, DEMO_END
+        days = self.plays['play_date']
+        return days.iloc[0].date(), days.iloc[-1].date()
+
+
+def _partitions(store_dir: Path) -> list[Path]:
+    return sorted((store_dir / 'plays').glob('*.parquet'))
+
+
+def _no_load(path):
+    return None
+
+
+_lock = threading.Lock()
+_cached: dict[tuple[Path, str], PlayStore] = {}
+
+
+def get_play_store(store_dir: Path = None, timezone: str = None) -> PlayStore | None:
+    """
+    回傳 process 共用的 PlayStore（每個時區一份）；store 不存在（靜態 demo）時回傳 None
+    任何檔案內容改變時（由 dataset registry 判斷）才重建
+    """
+    store_dir = Path(store_dir or STORE_DIR)
+    timezone = timezone or TIMEZONE
+    parts = _partitions(store_dir)
+    if not parts:
+        return None
+
+    meta = [store_dir / f for f in ('tracks.parquet', 'albums.parquet', 'track_artists.parquet')]
+    # registry 只用來追蹤檔案版本，資料本身由 PlayStore 持有，不重複佔記憶體
+    catalog_version = '-'.join(registry.version(p, loader=_no_load)[:8] for p in meta)
+    version = '-'.join(registry.version(p, loader=_no_load)[:8] for p in parts) + '|' + catalog_version
+    version += '|' + timezone
+
+    key = (store_dir, timezone)
+    store = _cached.get(key)
+    if store is not None and store.version == version:
+        return store
+
+    with _lock:
+        store = _cached.get(key)
+        if store is None or store.version != version:
+            plays = pd.concat([pd.read_parquet(p) for p in parts], ignore_index=True)
+            tracks, albums, track_artists = (pd.read_parquet(p) for p in meta)
+            index_path = store_dir / FIRST_PLAYED_FILE
+            first_played = registry.get(index_path, loader=FirstPlayIndex.load) if index_path.exists() else None
+            previous = store
+            store = PlayStore(plays, tracks, albums, track_artists, version, catalog_version, timezone, first_played)
+            if previous is not None and previous.catalog_version == catalog_version:
+                store.inherit(previous)
+            _cached[key] = store
+    return store
+
+
+def get_date_range(store_dir: Path = None, timezone: str = None) -> tuple[date, date]:
+    """store 內資料的第一天和最後一天（當地時間）"""
+    store = get_play_store(store_dir, timezone)
+    return store.date_range() if store is not None else (DEMO_START, DEMO_END)
+
+
+def append_plays(new_plays: pd.DataFrame, store_dir: Path = None):
+    """
+    寫入新的 plays，只改寫有新資料的月份 partition
+    (played_at, track_id) 重複的 play 只保留一筆；first-play index 只併入新的 plays
+    """
+    store_dir = Path(store_dir or STORE_DIR)
+    (store_dir / 'plays').mkdir(parents=True, exist_ok=True)
+
+    new_plays = new_plays[PLAY_COLUMNS].copy()
+    new_plays['played_at'] = pd.to_datetime(new_plays['played_at'], utc=True)
+    months = new_plays['played_at'].dt.strftime('%Y-%m')
+
+    for month, part in new_plays.groupby(months):
+        path = store_dir / 'plays' / f'{month}.parquet'
+        if path.exists():
+            part = pd.concat([pd.read_parquet(path), part], ignore_index=True)
+        part = (part.drop_duplicates(['played_at', 'track_id'])
+                    .sort_values('played_at', kind='stable')
+                    .reset_index(drop=True))
+        part.to_parquet(path, index=False)
+
+    index_path = store_dir / FIRST_PLAYED_FILE
+    if index_path.exists():
+        index = FirstPlayIndex.load(index_path).merge(new_plays)
+    else:  # 第一次建立：從所有 partition 建
+        index = FirstPlayIndex.from_plays(pd.concat([pd.read_parquet(p) for p in _partitions(store_dir)]))
+    index.save(index_path)
+
+
+def write_catalog(tracks: pd.DataFrame, albums: pd.DataFrame, track_artists: pd.DataFrame,
+                  store_dir: Path = None):
+    store_dir = Path(store_dir or STORE_DIR)
+    store_dir.mkdir(parents=True, exist_ok=True)
+    tracks.to_parquet(store_dir / 'tracks.parquet', index=False)
+    albums.to_parquet(store_dir / 'albums.parquet', index=False)
+    track_artists.to_parquet(store_dir / 'track_artists.parquet', index=False)
@@ -0,0 +1,57 @@
+"""
+單曲循環偵測：依時間排序的 plays 做 run-length encoding
+
+同一個 session 內、同一首歌連續播放的一段為一個 run。
+run 的邊界 = 相鄰兩筆的 track 或 session 不同，一次向量化比較就能找出所有 run，
+不需要 self-join。
+"""
+import numpy as np, pandas as pd
+from analytics.play_store import PlayStore
+from analytics.sessions import DEFAULT_GAP_MINUTES, get_session_ids
+
+
+def get_track_codes(store: PlayStore) -> np.ndarray:
+    """plays 的 track catalog 代碼（比較整數比比較字串快）"""
+    return store.plays['track_code'].to_numpy()
+
+
+def find_runs(tracks: np.ndarray, sessions: np.ndarray, min_count: int = 2) -> tuple[np.ndarray, np.ndarray]:
+    """
+    回傳 (starts, lengths)：長度 >= min_count 的 run 在輸入陣列中的起點與長度
+
+    Parameters:
+    - tracks: 每筆 play 的 track 代碼（依時間排序）
+    - sessions: 每筆 play 的 session id
+    """
+    n = len(tracks)
+    if n == 0:
+        return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)
+    boundary = np.empty(n, dtype=bool)
+    boundary[0] = True
+    np.not_equal(tracks[1:], tracks[:-1], out=boundary[1:])
+    boundary[1:] |= sessions[1:] != sessions[:-1]
+
+    starts = np.flatnonzero(boundary)
+    lengths = np.diff(np.append(starts, n))
+    keep = lengths >= min_count
+    return starts[keep], lengths[keep]
+
+
+def get_repeat_runs(store: PlayStore, start_date, end_date, min_count: int = 2,
+                    gap_minutes: float = DEFAULT_GAP_MINUTES) -> pd.DataFrame:
+    """
+    區間內所有重複播放 >= min_count 次的 run，依次數由多到少（同次數依時間先後）
+    欄位同 track_repeat_max：session_id, track, repeat_count, first_played
+    """
+    lo, hi = store.bounds(start_date, end_date)
+    sessions = get_session_ids(store, gap_minutes)[lo:hi]
+    starts, lengths = find_runs(get_track_codes(store)[lo:hi], sessions, min_count)
+
+    order = np.lexsort((starts, -lengths))
+    rows = lo + starts[order]
+    return pd.DataFrame({
+        'session_id': sessions[starts[order]],
+        'track': store.plays['track'].iloc[rows].to_numpy(),
+        'repeat_count': lengths[order],
+        'first_played': store.plays['local_time'].to_numpy()[rows]
+    })
@@ -0,0 +1,148 @@
+"""
+每日聆聽時長 rollup + prefix sum
+
+- 總時長：每天一格的 daily 陣列 + cum（cum[i] = 前 i 天總和），
+  任意區間總和 = cum[hi] - cum[lo]
+- artist / track / album：只存有播放的 (entity, day)，依 (entity, day) 排序，
+  整個陣列做一次 cumsum；每個 entity 的區間總和同樣是兩次查表相減
+- append 只聚合新的 plays 再併入陣列，不重新掃描歷史 plays
+"""
+from dataclasses import dataclass
+import numpy as np, pandas as pd
+
+GENRES = {'artist': ('artist', 'artist'), 'track': ('track_id', 'track'), 'album': ('album_id', 'album')}
+_DAY_BITS = 32
+
+
+def _day_index(plays: pd.DataFrame, day0: np.datetime64) -> np.ndarray:
+    return (plays['play_date'].to_numpy(dtype='datetime64[D]') - day0).astype('int64')
+
+
+def _cumsum0(values: np.ndarray) -> np.ndarray:
+    cum = np.empty(len(values) + 1)
+    cum[0] = 0.0
+    np.cumsum(values, out=cum[1:])
+    return cum
+
+
+@dataclass(frozen=True)
+class _EntityRollup:
+    ids: pd.Index           # code -> entity id
+    names: np.ndarray       # code -> 顯示名稱
+    keys: np.ndarray        # (code << 32) | day，已排序
+    values: np.ndarray      # 每個 key 當天的時長（秒）
+    cum: np.ndarray         # _cumsum0(values)
+
+    @classmethod
+    def build(cls, ids, names, codes, days, duration):
+        keys = (codes.astype('int64') << _DAY_BITS) | days
+        uniq, inv = np.unique(keys, return_inverse=True)
+        values = np.bincount(inv, weights=duration, minlength=len(uniq))
+        return cls(ids, names, uniq, values, _cumsum0(values))
+
+    def merge(self, ids, names, codes, days, duration):
+        new = _EntityRollup.build(ids, names, codes, days, duration)
+        pos = np.searchsorted(self.keys, new.keys)
+        exists = (pos < len(self.keys)) & (self.keys[np.minimum(pos, len(self.keys) - 1)] == new.keys)
+
+        values = self.values.copy()
+        np.add.at(values, pos[exists], new.values[exists])
+        keys = np.insert(self.keys, pos[~exists], new.keys[~exists])
+        values = np.insert(values, pos[~exists], new.values[~exists])
+        return _EntityRollup(ids, names, keys, values, _cumsum0(values))
+
+    def range_totals(self, lo: int, hi: int) -> np.ndarray:
+        """每個 entity 在 day 區間 [lo, hi) 的總時長，index = entity code"""
+        codes = np.arange(len(self.ids), dtype='int64') << _DAY_BITS
+        start = np.searchsorted(self.keys, codes | lo)
+        end = np.searchsorted(self.keys, codes | hi)
+        return self.cum[end] - self.cum[start]
+
+
+class DailyRollup:
+    def __init__(self, day0, daily, entities, last_ts):
+        self.day0 = day0
+        self.daily = daily
+        self.cum = _cumsum0(daily)
+        self.entities = entities
+        self.last_ts = last_ts   # 已經併入的最後一筆 play（UTC ns）
+
+    @classmethod
+    def build(cls, plays: pd.DataFrame, store) -> 'DailyRollup':
+        day0 = plays['play_date'].iloc[0].to_datetime64().astype('datetime64[D]')
+        return cls(day0, np.zeros(0), {}, None)._extend(plays, store)
+
+    def append(self, plays: pd.DataFrame, store) -> 'DailyRollup':
+        """回傳併入新 plays 後的 rollup（只處理 last_ts 之後的 plays）"""
+        ts = plays['played_at'].to_numpy(dtype='datetime64[ns]').view('int64')
+        plays = plays.iloc[np.searchsorted(ts, self.last_ts, side='right'):]
+        if len(plays) == 0:
+            return self
+        return DailyRollup(self.day0, self.daily, self.entities, self.last_ts)._extend(plays, store)
+
+    def _extend(self, plays, store):
+        days = _day_index(plays, self.day0)
+        duration = plays['duration'].to_numpy()
+        ndays = max(len(self.daily), int(days.max()) + 1)
+        daily = np.zeros(ndays)
+        daily[:len(self.daily)] = self.daily
+        np.add.at(daily, days, duration)
+
+        entities = {}
+        for genre, (id_col, name_col) in GENRES.items():
+            rows = store.artist_plays(plays) if genre == 'artist' else plays
+            prev = self.entities.get(genre)
+
+            new_ids = pd.Index(rows[id_col].unique())
+            if prev is not None:
+                new_ids = new_ids.difference(prev.ids, sort=False)
+            if id_col == name_col:
+                names = new_ids.to_numpy()
+            else:
+                names = rows.drop_duplicates(id_col).set_index(id_col)[name_col].reindex(new_ids).to_numpy()
+            ids = new_ids if prev is None else prev.ids.append(new_ids)
+            names = names if prev is None else np.concatenate([prev.names, names])
+
+            codes = ids.get_indexer(rows[id_col])
+            row_days = _day_index(rows, self.day0)
+            row_duration = rows['duration'].to_numpy()
+            entities[genre] = (_EntityRollup.build(ids, names, codes, row_days, row_duration) if prev is None
+                               else prev.merge(ids, names, codes, row_days, row_duration))
+
+        self.daily, self.cum, self.entities = daily, _cumsum0(daily), entities
+        self.last_ts = int(plays['played_at'].iloc[-1].value)
+        return self
+
+    # ===== 查詢 =====
+    def day_bounds(self, start_date, end_date) -> tuple[int, int]:
+        """當地日期（含頭含尾）-> day index [lo, hi)，限制在 rollup 範圍內"""
+        lo = (np.datetime64(pd.Timestamp(start_date).date()) - self.day0).astype('int64')
+        hi = (np.datetime64(pd.Timestamp(end_date).date()) - self.day0).astype('int64') + 1
+        return int(np.clip(lo, 0, len(self.daily))), int(np.clip(hi, 0, len(self.daily)))
+
+    def total(self, start_date, end_date) -> float:
+        lo, hi = self.day_bounds(start_date, end_date)
+        return float(self.cum[hi] - self.cum[lo]) if hi > lo else 0.0
+
+    def daily_series(self, start_date, end_date) -> pd.Series:
+        """每天的聆聽秒數，rollup 範圍外的日期補 0"""
+        days = pd.date_range(start_date, end_date, freq='D')
+        values = np.zeros(len(days))
+        lo, hi = self.day_bounds(start_date, end_date)
+        if hi > lo:
+            offset = int((self.day0 + lo - np.datetime64(days[0].date())).astype('int64'))
+            values[offset:offset + hi - lo] = self.daily[lo:hi]
+        return pd.Series(values, index=days)
+
+    def entity_totals(self, genre: str, start_date, end_date) -> pd.DataFrame:
+        """每個 artist / track / album 在區間內的總時長（只保留 > 0）"""
+        ent = self.entities[genre]
+        lo, hi = self.day_bounds(start_date, end_date)
+        totals = ent.range_totals(lo, hi)
+        nonzero = totals > 0
+        return pd.DataFrame({genre: ent.names[nonzero], 'duration': totals[nonzero]})
+
+
+def get_rollup(store) -> DailyRollup:
+    """store 共用的 rollup；store 只多了新 plays 時會由 PlayStore.inherit 增量更新"""
+    return store.derived('rollup', lambda s: DailyRollup.build(s.plays, s))
@@ -0,0 +1,66 @@
+"""
+Session 切分：上一首結束到下一首開始的間隔超過 gap 就是新的 session
+
+整個 store 一次向量化計算（diff + cumsum），結果依 gap 快取，
+時段模式（avg_session_time）、馬拉松聆聽、單曲循環都共用同一份 session_id。
+"""
+import threading
+from collections import OrderedDict
+import numpy as np
+from analytics.play_store import PlayStore
+
+DEFAULT_GAP_MINUTES = 30
+MAX_CACHED_GAPS = 4
+
+
+def split_sessions(ts: np.ndarray, ms_played: np.ndarray, gap_minutes: float) -> np.ndarray:
+    """
+    回傳每筆 play 的 session id（0, 1, 2, ...）
+
+    Parameters:
+    - ts: played_at（UTC epoch ns，已排序）
+    - ms_played: 每筆 play 的播放長度
+    - gap_minutes: 閒置超過幾分鐘算新的 session
+    """
+    if len(ts) == 0:
+        return np.zeros(0, dtype=np.int64)
+    ends = ts[:-1] + ms_played[:-1].astype(np.int64) * 1_000_000
+    new_session = (ts[1:] - ends) > int(gap_minutes * 60e9)
+    ids = np.empty(len(ts), dtype=np.int64)
+    ids[0] = 0
+    np.cumsum(new_session, out=ids[1:])
+    return ids
+
+
+class SessionIndex:
+    """一個 store 版本的 session_id，每個 gap 設定只算一次（保留最近 MAX_CACHED_GAPS 個）"""
+
+    def __init__(self, store: PlayStore):
+        self._ts = store.ts
+        self._ms_played = store.plays['ms_played'].to_numpy()
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+
+    def ids(self, gap_minutes: float = DEFAULT_GAP_MINUTES) -> np.ndarray:
+        with self._lock:
+            ids = self._cache.get(gap_minutes)
+            if ids is None:
+                ids = split_sessions(self._ts, self._ms_played, gap_minutes)
+                ids.flags.writeable = False
+                self._cache[gap_minutes] = ids
+                if len(self._cache) > MAX_CACHED_GAPS:
+                    self._cache.popitem(last=False)
+            else:
+                self._cache.move_to_end(gap_minutes)
+            return ids
+
+
+def get_session_ids(store: PlayStore, gap_minutes: float = DEFAULT_GAP_MINUTES) -> np.ndarray:
+    """整個 store 的 session_id（和 store.plays 同順序）"""
+    return store.derived('sessions', SessionIndex).ids(gap_minutes)
+
+
+def get_sessions(store: PlayStore, start_date, end_date, gap_minutes: float = DEFAULT_GAP_MINUTES):
+    """區間內的 plays，加上 session_id 欄位"""
+    lo, hi = store.bounds(start_date, end_date)
+    return store.plays.iloc[lo:hi].assign(session_id=get_session_ids(store, gap_minutes)[lo:hi])
@@ -0,0 +1,122 @@
+"""
+day × artist 的聆聽 bitmap：每位藝人一列，每天 1 bit（np.packbits, little bit order）
+
+- 聆聽天數 = 區間內 bit 的 popcount
+- 最長連續天數 = 對 unpack 後的 bool 矩陣做 run-length（diff 找出每段的起訖）
+兩者都是整個矩陣一次向量化運算，不對藝人做 Python 迴圈
+"""
+import numpy as np, pandas as pd
+
+_POPCOUNT = np.array([bin(i).count('1') for i in range(256)], dtype=np.uint8)
+CHUNK_ROWS = 4096  # unpack 時每次處理的藝人數，限制暫存矩陣的大小
+
+
+def _day_index(plays: pd.DataFrame, day0) -> np.ndarray:
+    return (plays['play_date'].to_numpy(dtype='datetime64[D]') - day0).astype('int64')
+
+
+class ArtistDayBitmap:
+    def __init__(self, artists: np.ndarray, day0, ndays: int, bits: np.ndarray, last_ts: int):
+        self.artists = artists       # row -> 藝人名稱
+        self.day0 = day0
+        self.ndays = ndays
+        self.bits = bits             # (藝人數, ceil(ndays / 8)) uint8
+        self.last_ts = last_ts
+        self._row = pd.Index(artists)
+
+    @classmethod
+    def build(cls, store) -> 'ArtistDayBitmap':
+        artists = store.track_artists['artist'].drop_duplicates().to_numpy()
+        day0 = store.plays['play_date'].iloc[0].to_datetime64().astype('datetime64[D]')
+        empty = np.zeros((len(artists), 0), dtype=np.uint8)
+        return cls(artists, day0, 0, empty, None)._set(store.plays, store)
+
+    def append(self, plays: pd.DataFrame, store) -> 'ArtistDayBitmap':
+        """回傳併入 last_ts 之後 plays 的新 bitmap（catalog 不變時由 PlayStore.inherit 呼叫）"""
+        ts = plays['played_at'].to_numpy(dtype='datetime64[ns]').view('int64')
+        plays = plays.iloc[np.searchsorted(ts, self.last_ts, side='right'):]
+        if len(plays) == 0:
+            return self
+        return ArtistDayBitmap(self.artists, self.day0, self.ndays, self.bits.copy(), self.last_ts)._set(plays, store)
+
+    def _set(self, plays, store):
+        rows = store.artist_plays(plays)
+        r = self._row.get_indexer(rows['artist'])
+        d = _day_index(rows, self.day0)
+
+        self.ndays = max(self.ndays, int(d.max()) + 1)
+        nbytes = (self.ndays + 7) // 8
+        if nbytes > self.bits.shape[1]:
+            bits = np.zeros((len(self.artists), nbytes), dtype=np.uint8)
+            bits[:, :self.bits.shape[1]] = self.bits
+            self.bits = bits
+        np.bitwise_or.at(self.bits, (r, d >> 3), (1 << (d & 7)).astype(np.uint8))
+        self.last_ts = int(plays['played_at'].iloc[-1].value)
+        return self
+
+    # ===== 查詢 =====
+    def day_bounds(self, start_date, end_date) -> tuple[int, int]:
+        lo = (np.datetime64(pd.Timestamp(start_date).date()) - self.day0).astype('int64')
+        hi = (np.datetime64(pd.Timestamp(end_date).date()) - self.day0).astype('int64') + 1
+        return int(np.clip(lo, 0, self.ndays)), int(np.clip(hi, 0, self.ndays))
+
+    def _masked_bytes(self, lo: int, hi: int) -> np.ndarray:
+        """[lo, hi) 範圍的 bytes，頭尾不在範圍內的 bit 清成 0"""
+        block = self.bits[:, lo >> 3:(hi + 7) >> 3].copy()
+        block[:, 0] &= np.uint8((0xFF << (lo & 7)) & 0xFF)
+        if hi & 7:
+            block[:, -1] &= np.uint8((1 << (hi & 7)) - 1)
+        return block
+
+    def total_days(self, start_date, end_date) -> pd.DataFrame:
+        """每位藝人在區間內有聆聽的天數（只保留 > 0）"""
+        lo, hi = self.day_bounds(start_date, end_date)
+        if hi <= lo:
+            return pd.DataFrame({'artist': [], 'total_days': []})
+        counts = _POPCOUNT[self._masked_bytes(lo, hi)].sum(axis=1, dtype=np.int64)
+        active = counts > 0
+        return pd.DataFrame({'artist': self.artists[active], 'total_days': counts[active]})
+
+    def longest_streaks(self, start_date, end_date) -> pd.DataFrame:
+        """每位藝人在區間內最長的連續聆聽天數與起訖日（同長度取較晚的一段）"""
+        lo, hi = self.day_bounds(start_date, end_date)
+        columns = ['artist', 'consecutive_days', 'streak_start', 'streak_end']
+        if hi <= lo:
+            return pd.DataFrame(columns=columns)
+
+        block = self._masked_bytes(lo, hi)
+        active = np.flatnonzero(block.any(axis=1))
+        offset, length = lo & 7, hi - lo
+
+        rows, lengths, ends = [], [], []
+        for i in range(0, len(active), CHUNK_ROWS):
+            chunk = active[i:i + CHUNK_ROWS]
+            m = np.unpackbits(block[chunk], axis=1, bitorder='little')[:, offset:offset + length]
+            edges = np.diff(np.pad(m.view(np.int8), ((0, 0), (1, 1))), axis=1)
+            r, col = np.nonzero(edges)         # 每列的起點 (+1)、終點 (-1) 依序成對出現
+            r, start, end = r[0::2], col[0::2], col[1::2]
+            run = end - start
+
+            # 每位藝人的最長 run；同長度取最晚的一段
+            first = np.r_[0, np.flatnonzero(np.diff(r)) + 1]
+            longest = np.maximum.reduceat(run, first)
+            hit = np.flatnonzero(run == np.repeat(longest, np.diff(np.r_[first, len(r)])))
+            best = hit[np.r_[np.flatnonzero(np.diff(r[hit])), len(hit) - 1]]
+            rows.append(chunk[r[best]])
+            lengths.append(run[best])
+            ends.append(end[best])
+
+        if not rows:
+            return pd.DataFrame(columns=columns)
+        rows, lengths, ends = np.concatenate(rows), np.concatenate(lengths), np.concatenate(ends)
+        streak_end = self.day0 + lo + ends - 1
+        return pd.DataFrame({
+            'artist': self.artists[rows],
+            'consecutive_days': lengths,
+            'streak_start': pd.to_datetime(streak_end - lengths + 1),
+            'streak_end': pd.to_datetime(streak_end)
+        })
+
+
+def get_artist_bitmap(store) -> ArtistDayBitmap:
+    return store.derived('artist_bitmap', ArtistDayBitmap.build)
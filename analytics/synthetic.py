@@ -0,0 +1,138 @@
+"""
+產生合成的 play-event store（本機開發、benchmark 用）
+
+名稱沿用 demo 的去識別化格式（Artist_001 / Album_001 / Track_0001），
+一部分 track_id 取自 data/liked.csv，讓「按讚 vs 播放」頁面有資料可以 join。
+
+python -m analytics.synthetic --years 5 --out data/store
+"""
+import argparse
+from datetime import date
+from pathlib import Path
+import numpy as np, pandas as pd
+from analytics.datasets import ROOT
+from analytics.play_store import TIMEZONE, append_plays, write_catalog
+
+CONTEXTS = np.array(['playlist', 'album', 'artist'])
+
+
+def generate_catalog(n_artists=700, n_albums=800, seed=0):
+    """回傳 (tracks, albums, track_artists)"""
+    rng = np.random.default_rng(seed)
+    liked_ids = pd.read_csv(ROOT / "data" / "liked.csv")['track_id'].tolist()
+
+    total_tracks = rng.integers(3, 16, n_albums)
+    album_ids = [f"{i:08x}" for i in rng.choice(16**8, n_albums, replace=False)]
+    album_artist = rng.integers(0, n_artists, n_albums)
+
+    n_tracks = int(total_tracks.sum())
+    new_ids = iter(f"{i:08x}" for i in rng.choice(16**8, n_tracks, replace=False))
+    track_ids = [liked_ids[i] if i < len(liked_ids) else next(new_ids) for i in rng.permutation(n_tracks)]
+
+    tracks = pd.DataFrame({
+        'track_id': track_ids,
+        'track': [f"Track_{i:04d}" for i in range(n_tracks)],
+        'album_id': np.repeat(album_ids, total_tracks),
+        'track_number': np.concatenate([np.arange(1, t + 1) for t in total_tracks]),
+        'duration_ms': rng.normal(210_000, 45_000, n_tracks).clip(60_000, 600_000).astype('int64')
+    })
+
+    # 約 15% 的歌有第二位歌手
+    main_artist = np.repeat(album_artist, total_tracks)
+    feat = rng.random(n_tracks) < 0.15
+    track_artists = pd.concat([
+        pd.DataFrame({'track_id': tracks['track_id'], 'artist': [f"Artist_{a:03d}" for a in main_artist]}),
+        pd.DataFrame({'track_id': tracks.loc[feat, 'track_id'],
+                      'artist': [f"Artist_{a:03d}" for a in rng.integers(0, n_artists, feat.sum())]})
+    ]).drop_duplicates().reset_index(drop=True)
+
+    albums = pd.DataFrame({
+        'album_id': album_ids,
+        'album': [f"Album_{i:03d}" for i in range(n_albums)],
+        'total_tracks': total_tracks,
+        'main_artists': [f"Artist_{a:03d}" for a in album_artist]
+    })
+    return tracks, albums, track_artists
+
+
+def generate_plays(tracks, albums, start=date(2021, 1, 1), end=date(2026, 1, 23),
+                   sessions_per_day=4.0, plays_per_session=12.0, seed=0) -> pd.DataFrame:
+    """
+    以 session 為單位產生 plays：
+    - 40% 的 session 從頭播放一張專輯
+    - 其他 session 依 Zipf 分布挑歌（熱門歌常重複），偶爾單曲循環
+    """
+    rng = np.random.default_rng(seed)
+    n_tracks = len(tracks)
+    popularity = 1 / np.arange(1, n_tracks + 1) ** 0.9
+    popularity = rng.permutation(popularity / popularity.sum())
+    duration_ms = tracks['duration_ms'].to_numpy()
+    album_first = np.concatenate([[0], np.cumsum(albums['total_tracks'].to_numpy())[:-1]])
+    album_size = albums['total_tracks'].to_numpy()
+
+    days = pd.date_range(start, end, freq='D')
+    n_sessions = rng.poisson(sessions_per_day, len(days))
+    session_day = np.repeat(days.to_numpy(), n_sessions)
+    # 當地時間，晚上比較多
+    hour = rng.choice(24, len(session_day), p=np.r_[np.full(7, 1), np.full(11, 3), np.full(6, 5)] / 70)
+    session_start = session_day + (hour * 3600 + rng.integers(0, 3600, len(hour))) * np.timedelta64(1, 's')
+    lengths = rng.geometric(1 / plays_per_session, len(session_start))
+
+    idx, contexts = [], []
+    for n in lengths:
+        if rng.random() < 0.4:
+            a = rng.integers(len(album_size))
+            k = min(n, album_size[a])
+            idx.append(album_first[a] + np.arange(k))
+            contexts.append(np.full(k, 'album'))
+        else:
+            picks = rng.choice(n_tracks, n, p=popularity)
+            if rng.random() < 0.05:
+                picks[:] = picks[0]
+            idx.append(picks)
+            contexts.append(np.full(n, CONTEXTS[rng.choice([0, 2], p=[0.8, 0.2])]))
+    lengths = np.array([len(i) for i in idx])
+    idx = np.concatenate(idx)
+
+    full = duration_ms[idx]
+    skipped = rng.random(len(idx)) < 0.15
+    ms_played = np.where(skipped, (full * rng.random(len(idx))).astype('int64'), full)
+
+    # 同一 session 內：每首歌接在上一首結束後
+    offsets = np.cumsum(ms_played) - ms_played
+    first = np.repeat(np.cumsum(lengths) - lengths, lengths)
+    offsets = offsets - offsets[first]
+    local = np.repeat(session_start, lengths) + offsets.astype('timedelta64[ms]')
+
+    played_at = (pd.DatetimeIndex(local).tz_localize(TIMEZONE, nonexistent='shift_forward', ambiguous=False)
+                 .tz_convert('UTC'))
+    plays = pd.DataFrame({
+        'played_at': played_at,
+        'track_id': tracks['track_id'].to_numpy()[idx],
+        'ms_played': ms_played,
+        'context_type': np.concatenate(contexts)
+    })
+    return plays.sort_values('played_at', kind='stable').reset_index(drop=True)
+
+
+def generate_store(out_dir, start=date(2021, 1, 1), end=date(2026, 1, 23), seed=0, **kwargs):
+    out_dir = Path(out_dir)
+    tracks, albums, track_artists = generate_catalog(seed=seed)
+    plays = generate_plays(tracks, albums, start, end, seed=seed, **kwargs)
+    write_catalog(tracks, albums, track_artists, out_dir)
+    append_plays(plays, out_dir)
+    return plays
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--out', default=str(ROOT / "data" / "store"))
+    parser.add_argument('--years', type=float, default=5)
+    parser.add_argument('--end', default='2026-01-23')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    end = pd.Timestamp(args.end).date()
+    start = (pd.Timestamp(end) - pd.Timedelta(days=round(365 * args.years))).date()
+    plays = generate_store(args.out, start, end, args.seed)
+    print(f"{len(plays):,} plays ({start} ~ {end}) -> {args.out}")
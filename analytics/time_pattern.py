@@ -0,0 +1,134 @@
+"""
+時段聆聽模式：GROUP BY CUBE(day_of_week, time_period) 的即時版本
+輸出欄位和 data/page2/df.parquest 相同
+- day_of_week: 0 = Sun ... 6 = Sat（同 PostgreSQL 的 dow）
+- rollup 的列以 NaN 表示「全部」
+
+每筆 play 先轉成整數 slot（store 載入時算好的 local_weekday * 4 + 時段代碼），所有指標都用 np.bincount 一次算完 28 個細格，
+再加總成 7 個「每天」、4 個「每時段」和 1 個總計，共 40 個 slot：
+- 可加總的指標（次數、時長、context 比例、新歌比例）直接對 slot 做 bincount
+- 需要 distinct / 巢狀平均的指標（重複率、跳過率、session 時間、藝人集中度）
+  先對 (slot, track / session / artist) 配對做一次 np.unique，配對的加總同樣可以往上 rollup
+"""
+import numpy as np, pandas as pd
+from analytics.first_play import get_first_play_index
+from analytics.concentration import DEFAULT_TOP_K, SlotArtistMatrix, get_play_artists
+from analytics.periods import DEFAULT_PERIOD_STARTS, TIME_PERIODS, period_codes
+from analytics.play_store import PlayStore
+from analytics.repeats import get_track_codes
+from analytics.sessions import DEFAULT_GAP_MINUTES, get_session_ids
+
+
+N_DETAIL = 7 * len(TIME_PERIODS)           # 28 個 (星期, 時段) 細格
+N_SLOTS = N_DETAIL + 7 + len(TIME_PERIODS) + 1
+
+# 細格 slot -> 它所屬的 4 個 grouping set slot（細格、該天、該時段、總計）
+_DOW, _PERIOD = np.divmod(np.arange(N_DETAIL), len(TIME_PERIODS))
+_EXPAND = np.stack([np.arange(N_DETAIL), N_DETAIL + _DOW, N_DETAIL + 7 + _PERIOD,
+                    np.full(N_DETAIL, N_SLOTS - 1)], axis=1)
+
+# 輸出順序同 groupby：細格依 (星期, 時段名稱)，接著每天、每時段、總計
+_BY_NAME = np.argsort(TIME_PERIODS)
+_ROW_ORDER = np.r_[(np.arange(7)[:, None] * len(TIME_PERIODS) + _BY_NAME).ravel(),
+                   N_DETAIL + np.arange(7), N_DETAIL + 7 + _BY_NAME, N_SLOTS - 1]
+
+CUBE_COLUMNS = ['day_of_week', 'time_period', 'total_plays', 'repeat_rate', 'total_time',
+                'prop_p_context', 'prop_al_context', 'prop_ar_context',
+                'avg_skip_rate', 'new_track_ratio', 'artist_concentration', 'avg_session_time']
+
+
+def get_first_played(store: PlayStore) -> np.ndarray:
+    """每首歌（track 代碼）第一次被播放的時間（UTC epoch ns），由 first-play index 查出"""
+    return store.derived('first_played', lambda s: get_first_play_index(s).lookup(s.catalog.track_ids))
+
+
+def _ratio(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    """a / b，沒有 play 的 slot 為 NaN"""
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return a / b
+
+
+def _rollup(detail: np.ndarray) -> np.ndarray:
+    """28 個細格的加總 -> 40 個 slot"""
+    grid = detail.reshape(7, len(TIME_PERIODS))
+    return np.r_[detail, grid.sum(axis=1), grid.sum(axis=0), detail.sum()]
+
+
+def _pair_sums(slot: np.ndarray, item: np.ndarray, *weights: np.ndarray) -> tuple:
+    """
+    每個 (slot, item) 配對的加總，rollup 到 40 個 slot
+    回傳 (配對的 slot, 配對的 item, 每個 weights 的配對加總...)
+    """
+    n_items = int(item.max()) + 1
+    pairs, inv = np.unique(slot.astype(np.int64) * n_items + item, return_inverse=True)
+    sums = [np.bincount(inv, weights=w, minlength=len(pairs)) for w in weights]
+
+    # 細格配對展開到 4 個 grouping set 後再合併一次（配對數遠小於 play 數）
+    up = _EXPAND[pairs // n_items] * n_items + (pairs % n_items)[:, None]
+    pairs, inv = np.unique(up.ravel(), return_inverse=True)
+    sums = [np.bincount(inv, weights=np.repeat(s, 4), minlength=len(pairs)) for s in sums]
+    return (pairs // n_items, pairs % n_items, *sums)
+
+
+def get_slots(plays: pd.DataFrame, period_starts=DEFAULT_PERIOD_STARTS) -> np.ndarray:
+    """每筆 play 的細格 slot（0-27）；預設分界直接用 local_period，否則由 local_hour 重新查表"""
+    if tuple(period_starts) == DEFAULT_PERIOD_STARTS:
+        period = plays['local_period'].to_numpy()
+    else:
+        period = period_codes(plays['local_hour'].to_numpy(), period_starts)
+    return plays['local_weekday'].to_numpy().astype(np.int64) * len(TIME_PERIODS) + period
+
+
+def build_cube(store: PlayStore, start_date, end_date, gap_minutes: float = DEFAULT_GAP_MINUTES,
+               period_starts=DEFAULT_PERIOD_STARTS, top_k: int = DEFAULT_TOP_K) -> pd.DataFrame:
+    """28 個 (星期, 時段) + 每天 + 每個時段 + 總計，共 40 列（沒有 play 的 slot 不輸出）"""
+    lo, hi = store.bounds(start_date, end_date)
+    if hi <= lo:
+        return pd.DataFrame(columns=CUBE_COLUMNS)
+    plays = store.plays.iloc[lo:hi]
+    slot = get_slots(plays, period_starts)
+
+    def count(weights=None):
+        return _rollup(np.bincount(slot, weights=weights, minlength=N_DETAIL).astype(np.float64))
+
+    duration = plays['duration'].to_numpy()
+    context = plays['context_type'].to_numpy()
+    tracks = get_track_codes(store)[lo:hi]
+    skipped = store.catalog.skipped(tracks, plays['ms_played'].to_numpy()).astype(np.float64)
+    is_new = (store.ts[lo:hi] == get_first_played(store)[tracks]).astype(np.float64)
+    total_plays = count()
+
+    # 重複率 / 跳過率：(slot, track) 配對
+    track_slot, _, track_plays, track_skips = _pair_sums(slot, tracks, np.ones(len(slot)), skipped)
+    n_tracks = np.bincount(track_slot, minlength=N_SLOTS)
+    skip_rate = _ratio(np.bincount(track_slot, weights=track_skips / track_plays, minlength=N_SLOTS), n_tracks)
+
+    # session 時間：(slot, session) 配對
+    sessions = get_session_ids(store, gap_minutes)[lo:hi]
+    session_slot, _, session_time = _pair_sums(slot, sessions - sessions[0], duration)
+    session_avg = _ratio(np.bincount(session_slot, weights=session_time, minlength=N_SLOTS),
+                         np.bincount(session_slot, minlength=N_SLOTS))
+
+    # 藝人集中度：(slot, artist) 時長矩陣，取每個 slot 的前 k 名
+    rows, artists, _ = get_play_artists(store)
+    a_lo, a_hi = np.searchsorted(rows, [lo, hi])
+    rows, artists = rows[a_lo:a_hi] - lo, artists[a_lo:a_hi]
+    concentration = SlotArtistMatrix(N_SLOTS, *_pair_sums(slot[rows], artists, duration[rows])).concentration(top_k)
+
+    cube = pd.DataFrame({
+        'day_of_week': np.r_[_DOW, np.arange(7), np.full(len(TIME_PERIODS) + 1, np.nan)],
+        'time_period': np.r_[np.array(TIME_PERIODS, dtype=object)[_PERIOD], np.full(7, np.nan),
+                             np.array(TIME_PERIODS, dtype=object), np.nan],
+        'total_plays': total_plays.astype(np.int64),
+        'repeat_rate': 1 - _ratio(n_tracks, total_plays),
+        'total_time': count(duration),
+        'prop_p_context': _ratio(count(context == 'playlist'), total_plays),
+        'prop_al_context': _ratio(count(context == 'album'), total_plays),
+        'prop_ar_context': _ratio(count(context == 'artist'), total_plays),
+        'avg_skip_rate': skip_rate.round(3),
+        'new_track_ratio': _ratio(count(is_new), total_plays).round(3),
+        'artist_concentration': concentration.round(3),
+        'avg_session_time': session_avg.round(1),
+    })
+    cube = cube.iloc[_ROW_ORDER]
+    return cube[cube['total_plays'] > 0].reset_index(drop=True)
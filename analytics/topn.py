@@ -0,0 +1,34 @@
+"""
+任意時間區間的 Top N artist / track / album（依聆聽時長）
+
+每個 entity 的區間總和由 rollup 的 prefix sum 合併每日的部分聚合取得，
+再用 np.partition（O(E)）找出第 n 名的門檻，只排序門檻以上的少數 entity，
+不對所有 entity 排序。
+"""
+import numpy as np, pandas as pd
+from analytics.names import dictionaries
+from analytics.rollup import DailyRollup
+
+MAX_N = 100  # overview 頁面 number_input 的上限
+
+
+def top_n(rollup: DailyRollup, genre: str, start_date, end_date, n: int = 10) -> pd.DataFrame:
+    """
+    回傳區間內前 n 名（格式同 df1 / df2 / df3，依 duration 由大到小）
+    同分時依名稱排序，結果和完整排序後取前 n 筆一致；名稱欄位是 names.py 的 id
+    """
+    n = int(min(n, MAX_N))
+    ent = rollup.entities[genre]
+    lo, hi = rollup.day_bounds(start_date, end_date)
+    totals = ent.range_totals(lo, hi)
+
+    candidates = np.flatnonzero(totals > 0)
+    if len(candidates) > n:
+        # 門檻取第 n 名的分數，同分者全部留下，避免任意切掉同分的 entity
+        kth = np.partition(totals[candidates], len(candidates) - n)[len(candidates) - n]
+        candidates = candidates[totals[candidates] >= kth]
+
+    names = dictionaries[genre].decode(ent.names[candidates]).astype(str)  # 只 decode 門檻以上的候選
+    order = np.lexsort((names, -totals[candidates]))[:n]
+    picked = candidates[order]
+    return pd.DataFrame({genre: ent.names[picked], 'duration': totals[picked]})
@@ -0,0 +1,86 @@
+"""
+合併多位歌手 benchmark：原本的 groupby + lambda vs 類別代碼版 transform_artists vs ArtistTable join
+
+python -m benchmarks.bench_artists [--rows 10000 100000 1000000] [--repeat 3]
+"""
+import argparse, time
+import numpy as np, pandas as pd
+from analytics.artists import join_artists
+from visualizations.like_listen_gap import transform_artists
+
+
+def lambda_transform_artists(df):
+    """原本的做法：每個 group 跑一次 Python lambda"""
+    group_cols = ['id', 'track', 'count']
+    if 'added_at' in df.columns:
+        group_cols.append('added_at')
+    return (df.groupby(group_cols, dropna=False)
+              .agg({'artist': lambda x: ', '.join(x.dropna())})
+              .reset_index()
+              .rename(columns={'id': 'track_id'}))
+
+
+def make_rows(n_rows, seed=0) -> tuple[pd.DataFrame, pd.DataFrame]:
+    """
+    回傳 (rows, track_artists)
+    rows 是 transform_artists 的輸入（每首歌 x 每位歌手一列），約 15% 的歌有第二位、3% 有第三位歌手
+    """
+    rng = np.random.default_rng(seed)
+    n_tracks = int(n_rows / 1.18)
+    n_artists = max(n_tracks // 10, 10)
+    track_ids = np.array([f"{i:08x}" for i in rng.choice(16**8, n_tracks, replace=False)], dtype=object)
+    extra = [np.flatnonzero(rng.random(n_tracks) < p) for p in (0.15, 0.03)]
+    track_pos = np.concatenate([np.arange(n_tracks), *extra])
+    artist_names = np.array([f"Artist_{a:05d}" for a in range(n_artists)], dtype=object)
+    track_artists = pd.DataFrame({'track_id': track_ids[track_pos],
+                                  'artist': artist_names[rng.integers(0, n_artists, len(track_pos))]})
+    track_artists.loc[rng.random(len(track_artists)) < 0.001, 'artist'] = None
+
+    counts = rng.zipf(1.6, n_tracks).clip(max=500)
+    added_at = pd.Timestamp('2020-01-01') + pd.to_timedelta(rng.integers(0, 6 * 365 * 86400, n_tracks), unit='s')
+    rows = pd.DataFrame({'id': track_ids[track_pos], 'track': [f"Track_{i}" for i in track_pos],
+                         'count': counts[track_pos], 'added_at': added_at[track_pos],
+                         'artist': track_artists['artist'].to_numpy()})
+    return rows, track_artists
+
+
+def best_ms(fn, repeat):
+    times = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        result = fn()
+        times.append((time.perf_counter() - t0) * 1000)
+    return min(times), result
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rows', type=int, nargs='+', default=[10_000, 100_000, 1_000_000])
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    rows = []
+    for n in args.rows:
+        df, track_artists = make_rows(n)
+        lambda_ms, expected = best_ms(lambda: lambda_transform_artists(df), args.repeat)
+        codes_ms, got = best_ms(lambda: transform_artists(df), args.repeat)
+
+        # ArtistTable：每個 catalog 版本建一次，之後每次查詢只是 indexing
+        track_ids = np.sort(track_artists['track_id'].unique())
+        index = pd.Index(track_ids)
+        build_ms, table = best_ms(lambda: join_artists(index.get_indexer(track_artists['track_id']),
+                                                       track_artists['artist'], len(track_ids)), args.repeat)
+        join_ms, joined = best_ms(lambda: table[index.get_indexer(expected['track_id'])], args.repeat)
+
+        exact = expected.equals(got) and np.array_equal(joined, expected['artist'].to_numpy())
+        rows.append({'rows': n, 'groups': len(expected), 'lambda_ms': lambda_ms, 'codes_ms': codes_ms,
+                     'table_build_ms': build_ms, 'table_join_ms': join_ms,
+                     'speedup': lambda_ms / codes_ms, 'exact': exact})
+
+    result = pd.DataFrame(rows)
+    print(result.to_string(index=False, float_format=lambda x: f"{x:.1f}"))
+    print(f"{'PASS' if result['exact'].all() else 'FAIL'}: same output as the groupby + lambda version")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+"""
+Range top-N benchmark：5 年以上的合成 plays，隨機時間區間 × n = 10 / 50 / 100
+
+python -m benchmarks.bench_topn [--years 5.5] [--queries 200]
+"""
+import argparse, time
+from datetime import date
+import numpy as np, pandas as pd
+from analytics.play_store import PlayStore
+from analytics.rollup import get_rollup
+from analytics.synthetic import generate_catalog, generate_plays
+from analytics.topn import top_n
+
+BUDGET_MS = 100
+
+
+def build_store(years, n_artists, n_albums, sessions_per_day, seed=0) -> PlayStore:
+    end = date(2026, 1, 23)
+    start = (pd.Timestamp(end) - pd.Timedelta(days=round(365 * years))).date()
+    tracks, albums, track_artists = generate_catalog(n_artists, n_albums, seed)
+    plays = generate_plays(tracks, albums, start, end, sessions_per_day=sessions_per_day, seed=seed)
+    return PlayStore(plays, tracks, albums, track_artists, 'bench')
+
+
+def naive_top_n(store, genre, start_date, end_date, n):
+    """原本的做法：slice 後 groupby 全部 entity 再完整排序"""
+    plays = store.slice(start_date, end_date)
+    if genre == 'artist':
+        plays = store.artist_plays(plays)
+    col = {'artist': 'artist', 'track': 'track_id', 'album': 'album_id'}[genre]
+    return plays.groupby(col)['duration'].sum().sort_values(ascending=False).iloc[:n]
+
+
+def random_ranges(store, k, rng):
+    first, last = (pd.Timestamp(d) for d in store.date_range())
+    span = (last - first).days
+    lengths = rng.choice([7, 30, 365, span], k)
+    starts = [first + pd.Timedelta(days=int(rng.integers(0, max(span - l, 0) + 1))) for l in lengths]
+    return [(s.date(), (s + pd.Timedelta(days=int(l) - 1)).date()) for s, l in zip(starts, lengths)]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--years', type=float, default=5.5)
+    parser.add_argument('--artists', type=int, default=5000)
+    parser.add_argument('--albums', type=int, default=8000)
+    parser.add_argument('--sessions-per-day', type=float, default=8)
+    parser.add_argument('--queries', type=int, default=200)
+    args = parser.parse_args()
+
+    t0 = time.perf_counter()
+    store = build_store(args.years, args.artists, args.albums, args.sessions_per_day)
+    print(f"store: {len(store):,} plays, {len(store.tracks):,} tracks, "
+          f"{store.track_artists['artist'].nunique():,} artists, {len(store.albums):,} albums "
+          f"({time.perf_counter() - t0:.1f}s)")
+
+    t0 = time.perf_counter()
+    rollup = get_rollup(store)
+    print(f"rollup build: {(time.perf_counter() - t0) * 1000:.0f} ms")
+
+    rng = np.random.default_rng(1)
+    rows = []
+    for genre in ['artist', 'track', 'album']:
+        for n in [10, 50, 100]:
+            ranges = random_ranges(store, args.queries, rng)
+            times = []
+            for s, e in ranges:
+                t0 = time.perf_counter()
+                top_n(rollup, genre, s, e, n)
+                times.append((time.perf_counter() - t0) * 1000)
+
+            # 少量查詢和原本做法比對：結果一致 + 速度
+            naive_times, exact = [], True
+            for s, e in ranges[:10]:
+                t0 = time.perf_counter()
+                expected = naive_top_n(store, genre, s, e, n)
+                naive_times.append((time.perf_counter() - t0) * 1000)
+                got = top_n(rollup, genre, s, e, n)
+                exact &= np.allclose(got['duration'].to_numpy(), expected.to_numpy())
+
+            rows.append({'genre': genre, 'n': n,
+                         'p50_ms': np.percentile(times, 50), 'p95_ms': np.percentile(times, 95),
+                         'max_ms': max(times), 'naive_p50_ms': np.percentile(naive_times, 50),
+                         'exact': exact})
+
+    df = pd.DataFrame(rows)
+    print(df.to_string(index=False, float_format=lambda x: f"{x:.2f}"))
+    ok = (df['max_ms'] < BUDGET_MS).all() and df['exact'].all()
+    print(f"{'PASS' if ok else 'FAIL'}: every query < {BUDGET_MS} ms and matches the full sort")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,10 +1,20 @@
 import streamlit as st
-import sys, pandas as pd
+import sys
 from pathlib import Path
-from utils import apply_pills_style
+from utils import apply_pills_style, get_selected_dates
 sys.path.insert(0, str(Path(__file__).parent.parent))
+from analytics.datasets import read_parquet, read_json, registry
+from analytics.names import decode_names, encoded_version, read_encoded
+from analytics.play_store import get_play_store
+from analytics.sessions import DEFAULT_GAP_MINUTES
+from analytics.overview import (
+    get_unique_values, get_context_texts, get_duration_per_day, get_top_entities,
+    get_highest_duration_day, get_highest_artist_day, get_track_repeat_max, get_artist_streaks
+)
+from visualizations.figure_cache import PagePayload
 from visualizations.overview import(
     create_listening_heatmap,
+    create_calendar_heatmap,
     create_topn
 )
 
@@ -13,22 +23,31 @@ st.set_page_config(
     page_icon="🎵",
     layout="wide"
 )
+payload = PagePayload('overview')  # 這一頁每張圖送出的 bytes
 
-start_date = pd.to_datetime('2025-10-25').date()
-end_date = pd.to_datetime('2026-01-23').date()
+store = get_play_store(timezone=st.session_state.get('timezone'))
+start_date, end_date = get_selected_dates(store)
 
 if start_date is None or end_date is None:
     st.info("⚠️ 請先去 Home page 選擇日期範圍")
     st.stop()
 
-df_unique_value = pd.read_parquet("./data/page1/df_unique_value.parquet")
-df_duration_per_day = pd.read_parquet("./data/page1/df_duration_per_day.parquet")
-df1 = pd.read_parquet("./data/page1/df1.parquet")
-df2 = pd.read_parquet("./data/page1/df2.parquet")
-df3 = pd.read_parquet("./data/page1/df3.parquet")
-import json
-with open('data/page1/texts.json', 'r', encoding='utf-8') as f:
-    texts = json.load(f)
+if store is None:
+    df_unique_value = read_parquet("./data/page1/df_unique_value.parquet")
+    df_duration_per_day = read_parquet("./data/page1/df_duration_per_day.parquet")
+    top_paths = {'artist': "./data/page1/df1.parquet", 'track': "./data/page1/df2.parquet",
+                 'album': "./data/page1/df3.parquet"}
+    texts = read_json('data/page1/texts.json')
+    data_version = ('snapshot', registry.version("./data/page1/df_duration_per_day.parquet"))
+else:
+    plays = store.slice(start_date, end_date)
+    if len(plays) == 0:
+        st.info("所選時間區間沒有聆聽紀錄")
+        st.stop()
+    df_unique_value = get_unique_values(plays, store, start_date, end_date)
+    df_duration_per_day = get_duration_per_day(store, start_date, end_date)
+    texts = get_context_texts(plays)
+    data_version = (store.version, start_date, end_date)
 primary_des = texts["primary_des"]
 full_des = texts["full_des"]
 
@@ -71,12 +90,24 @@ col5.metric("聆聽來源", primary_des, help=f"顯示你從哪裡聽歌： \n {
 # 取得 highlights 資料
 path = 'data/page1/'
 
-# 直接讀取並賦值給原有的變數名稱
-artist_streak_consecutive = pd.read_parquet(f'{path}artist_streak_consecutive.parquet')
-artist_total_days         = pd.read_parquet(f'{path}artist_total_days.parquet')
-highest_duration_day      = pd.read_parquet(f'{path}highest_duration_day.parquet')
-track_repeat_max          = pd.read_parquet(f'{path}track_repeat_max.parquet')
-highest_artist_day        = pd.read_parquet(f'{path}highest_artist_day.parquet')
+if store is None:
+    # 直接讀取並賦值給原有的變數名稱
+    artist_streak_consecutive = read_encoded(f'{path}artist_streak_consecutive.parquet')
+    artist_total_days         = read_encoded(f'{path}artist_total_days.parquet')
+    highest_duration_day      = read_parquet(f'{path}highest_duration_day.parquet')
+    track_repeat_max          = read_encoded(f'{path}track_repeat_max.parquet')
+    highest_artist_day        = read_encoded(f'{path}highest_artist_day.parquet')
+else:
+    artist_streak_consecutive, artist_total_days = get_artist_streaks(store, start_date, end_date)
+    highest_duration_day      = get_highest_duration_day(store, start_date, end_date)
+    track_repeat_max          = get_track_repeat_max(store, start_date, end_date,
+                                                     st.session_state.get('session_gap', DEFAULT_GAP_MINUTES))
+    highest_artist_day        = get_highest_artist_day(plays, store)
+
+# cards 只顯示第一列，只 decode 這幾列的名稱（沒有歌手資料時顯示 —）
+artist_streak_consecutive, artist_total_days, track_repeat_max, highest_artist_day = (
+    decode_names(df.iloc[:1]).fillna({'artist': '—'})
+    for df in (artist_streak_consecutive, artist_total_days, track_repeat_max, highest_artist_day))
 
 # 顯示 cards
 st.markdown("---")
@@ -194,6 +225,10 @@ st.markdown("""<hr style='margin-top: -20px; margin-bottom: 5px; border: none; b
 
 
 if selected_tabs == pills_tab[0]:
+    # 一年以上的區間預設用月曆（每年一列，單一 heatmap trace），圓點圖每天一個 marker
+    views = ["圓點", "月曆（每年一列）"]
+    view = st.radio("呈現方式", views, horizontal=True,
+                    index=int((end_date - start_date).days >= 365))
     with st.expander("自訂顏色", expanded=False):
         col1, _, col2, col3, _ = st.columns([1, 0.2, 1, 1, 0.8])
         with col1:
@@ -217,8 +252,12 @@ if selected_tabs == pills_tab[0]:
                 with col_b:
                     color_dark = st.color_picker("最深", "#3B5D7D")
 
-    fig1 = create_listening_heatmap(df_duration_per_day, size, color_light, color_dark)
-    st.plotly_chart(fig1, use_container_width=True)
+    if view == views[1]:
+        build_heatmap = lambda: create_calendar_heatmap(df_duration_per_day, color_light, color_dark)
+    else:
+        build_heatmap = lambda: create_listening_heatmap(df_duration_per_day, size, color_light, color_dark)
+    payload.chart('listening_heatmap', data_version, (view, size, color_light, color_dark), build_heatmap,
+                  use_container_width=True)
 
 
 
@@ -226,9 +265,14 @@ if selected_tabs == pills_tab[1]:
     col1, col2, _ = st.columns(3)
     with col1: genre = st.radio('類型', ['藝人', '歌曲', '專輯'], horizontal=True)
     with col2: number = st.number_input("顯示數量", 5, 100, 10)
-    if genre == '藝人': fig4 = create_topn(df1, genre='artist', n=number)
-    if genre == '歌曲': fig4 = create_topn(df2, genre='track', n=number)
-    if genre == '專輯': fig4 = create_topn(df3, genre='album', n=number)
-    st.plotly_chart(fig4, use_container_width=True)
+    col = {'藝人': 'artist', '歌曲': 'track', '專輯': 'album'}[genre]
+    if store is None:
+        top_version = ('snapshot', encoded_version(top_paths[col]))
+        build_topn = lambda: create_topn(decode_names(read_encoded(top_paths[col]).iloc[:number]), genre=col, n=number)
+    else:
+        top_version = data_version
+        build_topn = lambda: create_topn(decode_names(get_top_entities(store, col, start_date, end_date, number)),
+                                         genre=col, n=number)
+    payload.chart('topn', top_version, (col, number), build_topn, use_container_width=True)
 
 
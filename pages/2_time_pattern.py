@@ -1,14 +1,22 @@
 import streamlit as st
-import sys, pandas as pd, numpy as np
+import sys, numpy as np
 from pathlib import Path
-from utils import apply_pills_style
+from utils import apply_pills_style, get_selected_dates
 sys.path.insert(0, str(Path(__file__).parent.parent))
-
+from analytics.datasets import read_parquet, registry
+from analytics.play_store import get_play_store
+from analytics.time_pattern import build_cube
+from analytics.periods import DEFAULT_PERIOD_STARTS
+from analytics.concentration import DEFAULT_TOP_K
+from analytics.sessions import DEFAULT_GAP_MINUTES
+
+from visualizations.figure_cache import PagePayload
 from visualizations.time_pattern import (
     calculate_rankings,
-    format_time_slot_label,
-    get_mode_data, get_other_avg,
-    create_sparkline,
+    format_time_slot_labels,
+    get_comparison_table,
+    create_sparkline_strip,
+    get_metric_tensor,
     create_full_heatmap,
     create_grouped_bar
 )
@@ -18,43 +26,34 @@ st.set_page_config(
     page_icon="🎵",
     layout="wide"
 )
-start_date = pd.to_datetime('2025-10-25').date()
-end_date = pd.to_datetime('2026-01-23').date()
+payload = PagePayload('time_pattern')  # 這一頁每張圖送出的 bytes
+store = get_play_store(timezone=st.session_state.get('timezone'))
+start_date, end_date = get_selected_dates(store)
 st.title("Time Pattern Analysis")
 st.markdown(f"時間區間: {start_date} ~ {end_date}")
 
 if start_date is None or end_date is None:
     st.info("⚠️ 請先去 Home page 選擇日期範圍")
     st.stop()
-    
-df = pd.read_parquet("./data/page2/df.parquest")
-df_detail = calculate_rankings(df)
-df_detail['label'] = df_detail.apply(format_time_slot_label, axis=1)
-
-# Total Duration
-top_total = df_detail.loc[df_detail['total_time_rank'] == 1].iloc[0]
-total_sparkline_data = df_detail['total_time'].tolist()
-total_sparkline_labels = df_detail['label'].tolist()
-
-# Skip Rate
-top_skip = df_detail.loc[df_detail['skip_rate_rank'] == 1].iloc[0]
-skip_sparkline_data = df_detail['avg_skip_rate'].tolist()
-skip_sparkline_labels = df_detail['label'].tolist()
-
-# New Track Ratio
-top_new_track = df_detail.loc[df_detail['new_track_rank'] == 1].iloc[0]
-new_track_sparkline_data = df_detail['new_track_ratio'].tolist()
-new_track_sparkline_labels = df_detail['label'].tolist()
-
-# Session Time
-top_session = df_detail.loc[df_detail['session_time_rank'] == 1].iloc[0]
-session_sparkline_data = df_detail['avg_session_time'].tolist()
-session_sparkline_labels = df_detail['label'].tolist()
 
-# Session Time
-top_artist_concentration = df_detail.loc[df_detail['artist_concentration_rank'] == 1].iloc[0]
-artist_sparkline_data = df_detail['artist_concentration'].tolist()
-artist_sparkline_labels = df_detail['label'].tolist()
+top_k = DEFAULT_TOP_K
+if store is not None:
+    with st.sidebar:
+        top_k = st.number_input("藝人集中度：前幾名藝人", min_value=1, max_value=20, value=DEFAULT_TOP_K, step=1)
+
+if store is None:
+    df = read_parquet("./data/page2/df.parquest")
+    data_version = ('snapshot', registry.version("./data/page2/df.parquest"))
+else:
+    if len(store.slice(start_date, end_date)) == 0:
+        st.info("所選時間區間沒有聆聽紀錄")
+        st.stop()
+    cube_args = (st.session_state.get('session_gap', DEFAULT_GAP_MINUTES),
+                 tuple(st.session_state.get('period_starts', DEFAULT_PERIOD_STARTS)), top_k)
+    df = build_cube(store, start_date, end_date, *cube_args)
+    data_version = (store.version, start_date, end_date) + cube_args
+df_detail = calculate_rankings(df)
+slot_labels = format_time_slot_labels(df_detail)
 
 # 取 track level 的平均 (也就是找 group by cube() 兩個都是 none 的)
 df_avg_total = df.loc[df['day_of_week'].isna() & df['time_period'].isna()].iloc[0]
@@ -67,7 +66,7 @@ weighted_avg = {
 }
 
 with st.expander("關於這頁"):
-    st.markdown("""               
+    st.markdown(f"""               
 
     此頁面顯示你在不同時段的聆聽模式。
 
@@ -75,7 +74,9 @@ with st.expander("關於這頁"):
     - 總聆聽時長：顯示你最常聽音樂的時段
     - 未完成率：歌曲未聽完的比例平均（每首歌個別計算後平均）
     - 新歌比例：第一次聽的新歌比例
-    - 藝人集中度：聆聽時長集中在前 3 名藝人的比例
+    - 藝人集中度：聆聽時長集中在前 {top_k} 名藝人的比例
+    - 卡片下方的小圖：28 個時段（星期 × 時段）的數值，水平線是基準值
+      （總聆聽時長為 28 個時段的平均時長；藝人集中度為各時段依時長加權的平均；其他指標為整體值）
 
     **左下方 聆聽模式比較**：比較不同時段（平日/週末、時段、指定星期幾）的聆聽習慣差異
     - 重複播放率：同一首歌聽多次的比例
@@ -89,74 +90,35 @@ with st.expander("關於這頁"):
 
     """)
 
-col1, col2, col3, col4 = st.columns(4)
-
-# Card 1: Total Duration
-with col1:
-    st.metric(
-        label="總聆聽時長",
-        value=f"{df_avg_total['total_time'] / 3600:.1f} hrs total",
-    )
-    
-    fig1 = create_sparkline(
-        sum(total_sparkline_data)/24/3600,
-        [x / 3600 for x in total_sparkline_data],
-        total_sparkline_labels,
-        color="#67809A",fillcolor='rgba(119, 136, 193, 0.2)',
-        title='Duration'
-    )
-    st.plotly_chart(fig1, use_container_width=True, config={'displayModeBar': False})
-
-# Card 2: Skip Rate
-with col2:
-    st.metric(
-        label="未完成率",
-        value=f"{ df_avg_total['avg_skip_rate'] * 100:.1f}% overall",
-        help="歌曲未聽完的比例平均（每首歌個別計算後平均）"
-    )
-    
-    fig2 = create_sparkline(
-        df_avg_total['avg_skip_rate']*100,
-        [x * 100 for x in skip_sparkline_data],  # 轉成百分比
-        skip_sparkline_labels,
-        color='#8FBC8F',fillcolor='rgba(143, 188, 143, 0.2)',
-        title='Skip Rate %'
-    )
-    st.plotly_chart(fig2, use_container_width=True, config={'displayModeBar': False})
-
-# Card 3: New Track Ratio
-with col3:
-    st.metric(
-        label="新歌比例",
-        value=f"{df_avg_total['new_track_ratio'] * 100:.1f}%",
-        help = "第一次聽的新歌比例"
-    )
-    
-    fig3 = create_sparkline(
-        df_avg_total['new_track_ratio']*100,
-        [x * 100 for x in new_track_sparkline_data],
-        new_track_sparkline_labels,
-        color='#8267B8', fillcolor='rgba(130, 103, 184, 0.2)',
-        title='New Track %'
-    )
-    st.plotly_chart(fig3, use_container_width=True, config={'displayModeBar': False})
-
-# Card 4: Session Time
-with col4:
-    st.metric(
-        label="藝人集中度",
-        value=f"{df_avg_total['artist_concentration'] * 100} % overall",
-        help = "聆聽時長集中在前 3 名藝人的比例"
-    )
-
-    fig4 = create_sparkline(
-        weighted_avg['artist_concentration']*100,
-        [x*100 for x in artist_sparkline_data],  # 轉成分鐘
-        artist_sparkline_labels,
-        color='#CD853F',fillcolor='rgba(205, 133, 63, 0.2)',
-        title="Artist Concentration %"
-    )
-    st.plotly_chart(fig4, use_container_width=True, config={'displayModeBar': False})
+# 指標卡片：(label, value, help) + 下方 sparkline（指標欄位、倍率、基準線、顏色、hover 標題）
+cards = [
+    dict(label="總聆聽時長", value=f"{df_avg_total['total_time'] / 3600:.1f} hrs total", help=None,
+         column='total_time', scale=1 / 3600, avg=df_detail['total_time'].mean() / 3600,
+         color="#67809A", fillcolor='rgba(119, 136, 193, 0.2)', title='Duration'),
+    dict(label="未完成率", value=f"{df_avg_total['avg_skip_rate'] * 100:.1f}% overall",
+         help="歌曲未聽完的比例平均（每首歌個別計算後平均）",
+         column='avg_skip_rate', scale=100, avg=df_avg_total['avg_skip_rate'] * 100,
+         color='#8FBC8F', fillcolor='rgba(143, 188, 143, 0.2)', title='Skip Rate %'),
+    dict(label="新歌比例", value=f"{df_avg_total['new_track_ratio'] * 100:.1f}%", help="第一次聽的新歌比例",
+         column='new_track_ratio', scale=100, avg=df_avg_total['new_track_ratio'] * 100,
+         color='#8267B8', fillcolor='rgba(130, 103, 184, 0.2)', title='New Track %'),
+    dict(label="藝人集中度", value=f"{df_avg_total['artist_concentration'] * 100:.1f} % overall",
+         help=f"聆聽時長集中在前 {top_k} 名藝人的比例",
+         column='artist_concentration', scale=100, avg=weighted_avg['artist_concentration'] * 100,
+         color='#CD853F', fillcolor='rgba(205, 133, 63, 0.2)', title="Artist Concentration %"),
+]
+
+for col, card in zip(st.columns(len(cards)), cards):
+    with col:
+        st.metric(label=card['label'], value=card['value'], help=card['help'])
+
+# 所有卡片的 sparkline 共用一個 (指標 × 28 slot) 陣列，畫在同一個 figure
+def build_sparklines():
+    values = df_detail[[c['column'] for c in cards]].to_numpy(dtype=np.float64).T \
+             * np.array([c['scale'] for c in cards])[:, None]
+    return create_sparkline_strip(values, slot_labels, cards)
+payload.chart('sparklines', data_version, (), build_sparklines,
+              use_container_width=True, config={'displayModeBar': False})
 
 
 st.markdown("<br>", unsafe_allow_html=True)
@@ -212,17 +174,13 @@ with colL:
             st.info("ℹ️ 選擇了相同日期 - 顯示單一日期")
     
     if mode1 is not None and mode2 is not None:
-        # 取得資料
-        data1 = get_mode_data(df, mode1, comparison_mode)
-        
-        if mode2 in ["Other periods (avg)", "Other days (avg)"]:
-            data2 = get_other_avg(df, mode1, comparison_mode)
-        else:
-            data2 = get_mode_data(df, mode2, comparison_mode)
-        
-        # 畫 grouped bar
-        fig = create_grouped_bar(data1, data2, mode1, mode2)
-        st.plotly_chart(fig, use_container_width=True)
+        def build_grouped_bar():
+            # 查表取得兩組資料（表每個資料版本只算一次）
+            table = get_comparison_table(df, data_version)
+            return create_grouped_bar(table.lookup(comparison_mode, mode1),
+                                      table.lookup(comparison_mode, mode2, exclude_mode=mode1), mode1, mode2)
+        payload.chart('grouped_bar', data_version, (comparison_mode, mode1, mode2), build_grouped_bar,
+                      use_container_width=True)
     else:
         st.info("請選擇兩個時段/日期進行比較")
     
@@ -242,7 +200,6 @@ with colR:
             'colorbar_title': 'Hours',
             'unit': 'hrs',
             'hover_label': 'Total Duration',
-            'hover_format': ':.1f',
             'colorscale': [[0.0, "#D7E3F0"], [1.0, "#5C748D"]]
         },
         'avg_skip_rate': {
@@ -250,7 +207,6 @@ with colR:
             'colorbar_title': 'Skip Rate',
             'unit': '%',
             'hover_label': 'Skip Rate',
-            'hover_format': ':.1%',
             'colorscale': [[0.0, "#E0F1E0"], [1.0, "#689468"]]  
         },
         'new_track_ratio': {
@@ -258,7 +214,6 @@ with colR:
             'colorbar_title': 'New Track %',
             'unit': '%',
             'hover_label': 'New Track Ratio',
-            'hover_format': ':.1%',
             'colorscale': [[0.0, "#D9D3E5"], [1.0, "#695395"]]  
         },
         'artist_concentration': {
@@ -266,17 +221,16 @@ with colR:
             'colorbar_title': 'Concentration',
             'unit': '%',
             'hover_label': 'Artist Concentration',
-            'hover_format': ':.1%',
             'colorscale': [[0.0, "#EEE6DE"], [1.0, '#CD853F']]  
         },
         'repeat_rate': {
             'colorbar_title': 'Concentration',
             'unit': '%',
             'hover_label': 'Artist Concentration',
-            'hover_format': ':.1%',
             'colorscale': [[0.0, "#EEE6DE"], [1.0, '#CD853F']]  
         }
     }
 
-    fig = create_full_heatmap(df, selected_var, configs[selected_var])
-    st.plotly_chart(fig, use_container_width=True)
\ No newline at end of file
+    payload.chart('full_heatmap', data_version, (selected_var,),
+                  lambda: create_full_heatmap(get_metric_tensor(df, data_version), selected_var, configs[selected_var]),
+                  use_container_width=True)
\ No newline at end of file
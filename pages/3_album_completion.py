@@ -1,9 +1,14 @@
 import streamlit as st
-import sys, pandas as pd
+import sys
 from pathlib import Path
-from utils import apply_pills_style
+from utils import apply_pills_style, get_selected_dates
 sys.path.insert(0, str(Path(__file__).parent.parent))
+from analytics.names import decode_names, dictionaries, encoded_version, read_encoded
+from analytics.play_store import get_play_store
+from analytics.album_completion import get_album_duration, get_marathon_listen
+from analytics.sessions import DEFAULT_GAP_MINUTES
 
+from visualizations.figure_cache import PagePayload
 from visualizations.album_completion import (
     create_album_treemap,
     create_marathon_listen
@@ -14,11 +19,12 @@ st.set_page_config(
     page_icon="🎵",
     layout="wide"
 )
-start_date = pd.to_datetime('2025-10-25 00:00')
-end_date = pd.to_datetime('2026-01-23 23:59')
+payload = PagePayload('album_completion')  # 這一頁每張圖送出的 bytes
+store = get_play_store(timezone=st.session_state.get('timezone'))
+start_date, end_date = get_selected_dates(store)
 
 st.title("Album Completion Analysis")
-st.markdown(f"時間區間: {start_date} ~ {end_date}")
+st.markdown(f"時間區間: {start_date} 00:00 ~ {end_date} 23:59")
 
 with st.sidebar:
     st.info("demo 用，所以名稱 (e.g., 歌名) 都做了去識別化")
@@ -30,11 +36,18 @@ if start_date is None or end_date is None:
     st.info("⚠️ 請先去 Home page 選擇日期範圍")
     st.stop()
 
-df_duration_raw = pd.read_parquet("./data/page3/df_duration.parquet")
+if store is None:
+    df_duration_raw = read_encoded("./data/page3/df_duration.parquet")
+    df_marathon_raw = read_encoded("./data/page3/df_marathon.parquet")
+    data_version = ('snapshot', encoded_version("./data/page3/df_duration.parquet"),
+                    encoded_version("./data/page3/df_marathon.parquet"))
+else:
+    df_duration_raw = get_album_duration(store, start_date, end_date)
+    gap = st.session_state.get('session_gap', DEFAULT_GAP_MINUTES)
+    df_marathon_raw = get_marathon_listen(store, start_date, end_date, gap)
+    data_version = (store.version, start_date, end_date, gap)
 df_duration = df_duration_raw.loc[df_duration_raw['prop'] >= prop, :]
-df_marathon_raw = pd.read_parquet("./data/page3/df_marathon.parquet")
 df_marathon = df_marathon_raw.loc[df_marathon_raw['unique_tracks'] >= df_marathon_raw['total_tracks']*prop2, :]
-fig1 = create_album_treemap(df_duration)
 
 with st.expander("關於這頁"):
     st.markdown("""               
@@ -67,10 +80,11 @@ st.markdown("""<hr style='margin-top: -20px; margin-bottom: 5px; border: none; b
 
 
 if selected_tabs == pills_tab[0]:
-    st.plotly_chart(fig1, use_container_width=True, config={'displayModeBar': True})
+    payload.chart('album_treemap', data_version, (prop,), lambda: create_album_treemap(decode_names(df_duration)),
+                  use_container_width=True, config={'displayModeBar': True})
     with st.expander("View Detailed Data"):
         st.dataframe(
-            df_duration[['album', 'main_artists', 'total_duration']].rename(columns={
+            decode_names(df_duration[['album', 'main_artists', 'total_duration']]).rename(columns={
                 'main_artists': 'artist(s)',
                 'total_duration': 'listening time'
             }),
@@ -88,15 +102,18 @@ if selected_tabs == pills_tab[1]:
     )
 
     st.markdown(f"**連續聆聽紀錄** (專輯完播率 ≥ {prop2*100:.0f}%)  \n*顏色代表完成次數*")
-    album_counts = df_marathon.groupby('album').size().reset_index(name='count')
-    top_albums = album_counts.nlargest(top_n, 'count')['album']
-    df_display = df_marathon[df_marathon['album'].isin(top_albums)]
-
-    # 截斷名稱
-    df_display['album_short'] = df_display['album'].apply(
-        lambda x: x if len(x) <= 20 else x[:19] + '...'
-    )
+    def build_marathon():
+        album_counts = df_marathon.groupby('album').size().reset_index(name='count')
+        album_counts['name'] = dictionaries['album'].decode(album_counts['album'])
+        top_albums = album_counts.sort_values('name', kind='stable').nlargest(top_n, 'count')['album']  # 同次數依專輯名稱
+        df_display = decode_names(df_marathon[df_marathon['album'].isin(top_albums)])
+
+        # 截斷名稱
+        df_display['album_short'] = df_display['album'].apply(
+            lambda x: x if len(x) <= 20 else x[:19] + '...'
+        )
 
-    df_display['play_count'] = df_display.groupby('album')['album'].transform('count')
-    fig2 = create_marathon_listen(df_display)
-    st.plotly_chart(fig2, use_container_width=True, config={'displayModeBar': True})
\ No newline at end of file
+        df_display['play_count'] = df_display.groupby('album')['album'].transform('count')
+        return create_marathon_listen(df_display)
+    payload.chart('marathon_listen', data_version, (prop2, top_n), build_marathon,
+                  use_container_width=True, config={'displayModeBar': True})
\ No newline at end of file
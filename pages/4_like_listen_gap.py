@@ -1,10 +1,14 @@
 import streamlit as st
 import sys, pandas as pd, random
 from pathlib import Path
+from analytics.play_store import get_play_store
+from analytics.like_listen_gap import GapIndex, get_gap_index, get_store_gap_lists, get_snapshot_gap_lists
+from analytics.liked_songs import liked_version
+from analytics.names import decode_names, encoded_version, read_encoded
+from utils import PageCursor, get_selected_dates
 from visualizations.like_listen_gap import (
     get_rate,
-    filter_by_liked_date,
-    filter_by_long_days
+    filter_by_liked_date
 )
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
@@ -14,23 +18,16 @@ st.set_page_config(
     layout="wide"
 )
 
-start_date = pd.to_datetime('2025-10-25 00:00')
-end_date = pd.to_datetime('2026-01-23 23:59')
-
-# ===== Session State 初始化 =====
-if 'forgotten_idx' not in st.session_state:
-    st.session_state['forgotten_idx'] = 0
-if 'frequent_idx' not in st.session_state:
-    st.session_state['frequent_idx'] = 0
-if 'long_idx' not in st.session_state:
-    st.session_state['long_idx'] = 0
-
-if 'displayed_forgotten' not in st.session_state:
-    st.session_state['displayed_forgotten'] = pd.DataFrame()
-if 'displayed_frequent' not in st.session_state:
-    st.session_state['displayed_frequent'] = pd.DataFrame()
-if 'displayed_long' not in st.session_state:
-    st.session_state['displayed_long'] = pd.DataFrame()
+store = get_play_store(timezone=st.session_state.get('timezone'))
+start_date, end_date = get_selected_dates(store)
+if start_date is None or end_date is None:
+    st.info("⚠️ 請先去 Home page 選擇日期範圍")
+    st.stop()
+if store is not None and len(store.slice(start_date, end_date)) == 0:
+    st.info("所選時間區間沒有聆聽紀錄")
+    st.stop()
+start_date = pd.to_datetime(start_date)
+end_date = pd.to_datetime(end_date) + pd.Timedelta(hours=23, minutes=59)
 
 st.title("What you like vs. What you listen")
 with st.expander("關於這頁"):
@@ -87,7 +84,7 @@ with st.sidebar:
     with col2:
         analysis_end = st.date_input(
             "結束",
-            value = pd.to_datetime(end_date) - pd.Timedelta(days=5),
+            value = max(pd.to_datetime(start_date), pd.to_datetime(end_date) - pd.Timedelta(days=5)),  # 區間不到 5 天時不能早於開始
             min_value = pd.to_datetime(start_date),
             max_value = pd.to_datetime(end_date)
         )
@@ -104,30 +101,40 @@ with st.sidebar:
 top = 1 - top  # 轉換成百分位
 bottom = bottom
 
-# ===== 載入所有資料 =====
-df_forgotten_raw = pd.read_parquet("./data/page4/df_forgotten.parquet")
-df_frequent_not_liked_raw = pd.read_parquet("./data/page4/df_frequent_not_liked.parquet")
-df = pd.read_parquet("./data/page4/df.parquet")
-bottom_threshold = df['count'].quantile(bottom, interpolation='lower')
-top_threshold = df['count'].quantile(top, interpolation='lower')
-
-df_forgotten = df_forgotten_raw.loc[df_forgotten_raw['count']<=bottom_threshold, :]
-df_frequent_not_liked = df_frequent_not_liked_raw.loc[df_frequent_not_liked_raw['count']>=top_threshold, :]
-
-df_forgotten_filtered = filter_by_liked_date(df_forgotten, analysis_start, analysis_end)
-df_forgotten_sorted = df_forgotten_filtered.sort_values('count', ascending=False).reset_index(drop=True)
-df_frequent_sorted = df_frequent_not_liked.sort_values('count', ascending=False).reset_index(drop=True)
+# ===== 載入所有資料（每個 dataset 版本建一次門檻索引）=====
+# 按讚 / 沒按讚是 track 代碼上的 join，按讚資料更新時（liked_version 改變）會重新切
+if store is None:
+    paths = ["./data/page4/df.parquet", "./data/page4/df_forgotten.parquet",
+             "./data/page4/df_frequent_not_liked.parquet"]
+    index_key = ('snapshot', liked_version()) + tuple(encoded_version(p) for p in paths)
+    def build_index():
+        counts, liked, not_liked = get_snapshot_gap_lists(*(read_encoded(p) for p in paths))
+        return GapIndex(counts, liked, not_liked, liked)
+else:
+    index_key = (store.version, liked_version(), start_date.date(), end_date.date())
+    def build_index():
+        counts, liked, not_liked = get_store_gap_lists(store, start_date, end_date)
+        return GapIndex(counts, liked, not_liked, liked)
+gap_index = get_gap_index(index_key, build_index)
+
+top_threshold = gap_index.threshold(top)
+df_frequent_sorted = gap_index.frequent(top).reset_index(drop=True)
+df_forgotten_sorted = filter_by_liked_date(gap_index.forgotten(bottom), analysis_start, analysis_end).reset_index(drop=True)
 
 
 # ===== 計算 Metrics =====
 liked_count, liked_count_a = get_rate(start_date, end_date, analysis_start, analysis_end)
-total_count = 1532
-top_region_count = (df['count']>=top_threshold).sum()
+total_count = len(gap_index)
+top_region_count = gap_index.count_at_least(top_threshold)
+
+def percent(count, total):
+    # 分母是 0（區間內沒有按讚 / 沒有播放）時顯示 —
+    return f"{(count/total)*100:.1f}%" if total else "—"
 
 col1, col2, col3 = st.columns(3)
-col1.metric(label="按讚但少聽比例", value=f"{(len(df_forgotten_filtered)/liked_count_a)*100:.1f}%")
-col2.metric(label="常聽未按讚比例", value=f"{(len(df_frequent_not_liked)/top_region_count)*100:.1f}%")
-col3.metric(label="按讚的比例", value=f"{(liked_count/total_count)*100:.1f}%", help="基於聆聽資料蒐集時間計算，不隨側欄篩選變動")
+col1.metric(label="按讚但少聽比例", value=percent(len(df_forgotten_sorted), liked_count_a))
+col2.metric(label="常聽未按讚比例", value=percent(len(df_frequent_sorted), top_region_count))
+col3.metric(label="按讚的比例", value=percent(liked_count, total_count), help="基於聆聽資料蒐集時間計算，不隨側欄篩選變動")
 
 # ===== CSS Styling =====
 st.markdown("""
@@ -180,7 +187,7 @@ def display_cards(df, count=3):
         st.warning("沒有符合條件的歌曲")
         return
     
-    for _, row in df.head(count).iterrows():
+    for _, row in decode_names(df.head(count)).iterrows():
         # 格式化 added_at
         added_date = pd.to_datetime(row['added_at']).strftime('%Y-%m-%d') if 'added_at' in row else "N/A"
         
@@ -198,7 +205,7 @@ def display_cards_frequent(df, count=3):
         st.warning("沒有符合條件的歌曲")
         return
     
-    for _, row in df.head(count).iterrows():
+    for _, row in decode_names(df.head(count)).iterrows():
         st.markdown(f"""
         <div class='hover-card'>
             <div class='card-artist'>{row['artist']}</div>
@@ -210,148 +217,57 @@ def display_cards_frequent(df, count=3):
 st.markdown("---")
 col1, col2, col3 = st.columns(3)
 
-# ===== Section 1: Forgotten Like =====
-with col1:
-    st.header("按讚但少聽")
-    st.caption(f"{analysis_start} ~ {analysis_end} 按讚的歌 & 聆聽量整體後 {(bottom*100):.1f} %")
-
+# ===== 分頁：每個區塊是獨立的 fragment =====
+# 按「顯示 3 首」/「重置」只重跑該區塊，卡片從快取好的排序結果 slice；
+# session_state 只存 offset + 清單版本，版本（資料、門檻）變了就從頭開始
+@st.fragment
+def card_section(name, rows, version, display):
+    cursor = PageCursor(f'{name}_cursor', version)
     col_btn1, col_btn2 = st.columns([1, 2.5])
+    button_label = "再顯示 3 首" if cursor.offset > 0 else "顯示 3 首"
+    col_btn1.button(button_label, key=f"btn_{name}_refresh", on_click=cursor.next, args=(len(rows),))
+    col_btn2.button("重置", key=f"btn_{name}_reset", on_click=cursor.reset)
 
-    button_label = f"再顯示 3 首" if st.session_state['forgotten_idx'] > 0 else "顯示 3 首"
-    
-    if col_btn1.button(button_label, key="btn_forgotten_refresh"):
-        start_idx = st.session_state['forgotten_idx']
-        end_idx = start_idx + 3
-        
-        if start_idx >= len(df_forgotten_sorted):
-            st.session_state['remaining_count_forgotten'] = 0
-            st.session_state['show_no_more_forgotten'] = True
-        else:
-            cards = df_forgotten_sorted.iloc[start_idx:end_idx]
-            st.session_state['displayed_forgotten'] = cards
-            st.session_state['forgotten_idx'] = end_idx
-            
-            remaining = len(df_forgotten_sorted) - end_idx
-            st.session_state['remaining_count_forgotten'] = remaining 
-            st.session_state['show_no_more_forgotten'] = False
-            
-        st.rerun()
-
-    else:
-        # 顯示卡片
-        if not st.session_state['displayed_forgotten'].empty:
-            display_cards(st.session_state['displayed_forgotten'])
-        
-        # 顯示剩餘數量
-        if st.session_state.get('show_no_more_forgotten', False):
-            st.info("已經沒有更多歌曲了！")
-        elif st.session_state.get('remaining_count_forgotten', 0) > 0:
-            st.caption(f"剩餘 {st.session_state['remaining_count_forgotten']} 首")
-
-    if col_btn2.button("重置", key="btn_forgotten_reset"):
-        st.session_state['forgotten_idx'] = 0
-        st.session_state['displayed_forgotten'] = pd.DataFrame()
-        st.session_state['remaining_count_forgotten'] = 0
-        st.session_state['show_no_more_forgotten'] = False
-        st.rerun()
-    
-
-
-# ===== Section 2: Frequent Not Liked =====
-with col2:
-    st.header("常聽但未按讚")
-    st.caption(f"未按讚的歌 & 聆聽量整體前 {(1-top)*100:.1f} %")
-    col_btn3, col_btn4 = st.columns([1, 2.5])
-
-    button_label = f"再顯示 3 首" if st.session_state['frequent_idx'] > 0 else "顯示 3 首"
-    
-    if col_btn3.button(button_label, key="btn_frequent_refresh"):
-        start_idx = st.session_state['frequent_idx']
-        end_idx = start_idx + 3
-        
-        if start_idx >= len(df_frequent_sorted):
-            st.session_state['remaining_count_frequent'] = 0
-            st.session_state['show_no_more_frequent'] = True
-        else:
-            cards = df_frequent_sorted.iloc[start_idx:end_idx]
-            st.session_state['displayed_frequent'] = cards  
-            st.session_state['frequent_idx'] = end_idx
-
-            remaining = len(df_frequent_sorted) - end_idx
-            st.session_state['remaining_count_frequent'] = remaining  # ← 存起來
-            st.session_state['show_no_more_frequent'] = False            
+    cards = cursor.page(rows)
+    if len(cards) > 0:
+        display(cards)
 
-        st.rerun()
-    
-    else:
-        if not st.session_state['displayed_frequent'].empty:
-            display_cards_frequent(st.session_state['displayed_frequent'])
+    # 顯示剩餘數量
+    if cursor.exhausted:
+        st.info("已經沒有更多歌曲了！")
+    elif cursor.offset > 0 and cursor.remaining(len(rows)) > 0:
+        st.caption(f"剩餘 {cursor.remaining(len(rows))} 首")
 
-        # 顯示剩餘數量
-        if st.session_state.get('show_no_more_frequent', False):
-            st.info("已經沒有更多歌曲了！")
-        elif st.session_state.get('remaining_count_frequent', 0) > 0:
-            st.caption(f"剩餘 {st.session_state['remaining_count_frequent']} 首")
-    
-    if col_btn4.button("重置", key="btn_frequent_reset"):
-        st.session_state['frequent_idx'] = 0
-        st.session_state['displayed_frequent'] = pd.DataFrame()
-        st.session_state['remaining_count_frequent'] = 0
-        st.session_state['show_no_more_frequent'] = False
-        st.rerun()
-    
 
-# ===== Section 3: Long Love =====
-with col3: 
-    st.header("回味經典")
-    
+@st.fragment
+def long_section(gap_index, index_key):
     col_top, col_bottom = st.columns(2)
     top_sec3 = col_top.number_input("常聽門檻 - Top %", 0.0, 50.0, 5.0, 0.5, format="%.1f", key='top_percent_sec3')/100.0
     top_sec3 = 1-top_sec3
     long_days = col_bottom.number_input("定義「很久」= 距今幾天", min_value=30, max_value=1500, value=180, step=5)
     st.caption(f"{long_days} 天前按讚 & 聆聽量佔整體 {(1-top_sec3)*100:.1f} %")
 
-    # Filter
-    df_long_raw = pd.read_parquet("./data/page4/df_long.parquet")
-    top_sec3_threshold = df['count'].quantile(top_sec3, interpolation='lower')
-    df_long = df_long_raw.loc[df_long_raw['count']>=top_sec3_threshold, :]
-    df_long_filtered = filter_by_long_days(df_long, long_days)
-    df_long_sorted = df_long_filtered.sort_values('added_at').reset_index(drop=True)
+    # Filter：「很久以前」= 按讚時間早於 cutoff
+    cutoff = pd.Timestamp.now() - pd.Timedelta(days=long_days)
+    df_long_sorted = gap_index.long(top_sec3, cutoff).reset_index(drop=True)
+    card_section('long', df_long_sorted, index_key + (top_sec3, long_days), display_cards)
 
-    col_btn5, col_btn6 = st.columns([1, 2.5])
 
-    button_label = f"再顯示 3 首" if st.session_state['long_idx'] > 0 else "顯示 3 首"
-    
-    if col_btn5.button(button_label, key="btn_long_refresh"):
-        start_idx = st.session_state['long_idx']
-        end_idx = start_idx + 3        
-        
-        if start_idx >= len(df_long_sorted):
-            st.session_state['remaining_count_long'] = 0
-            st.session_state['show_no_more_long'] = True
-        else:
-            cards = df_long_sorted.iloc[start_idx:end_idx]
-            st.session_state['displayed_long'] = cards  
-            st.session_state['long_idx'] = end_idx
+# ===== Section 1: Forgotten Like =====
+with col1:
+    st.header("按讚但少聽")
+    st.caption(f"{analysis_start} ~ {analysis_end} 按讚的歌 & 聆聽量整體後 {(bottom*100):.1f} %")
+    card_section('forgotten', df_forgotten_sorted, index_key + (bottom, analysis_start, analysis_end), display_cards)
 
-            remaining = len(df_long_sorted) - end_idx
-            st.session_state['remaining_count_long'] = remaining  
-            st.session_state['show_no_more_long'] = False
-            
-        st.rerun()
-    
-    else:
-        if not st.session_state['displayed_long'].empty:
-            display_cards(st.session_state['displayed_long'])
 
-        if st.session_state.get('show_no_more_long', False):
-            st.info("已經沒有更多歌曲了！")
-        elif st.session_state.get('remaining_count_long', 0) > 0:
-            st.caption(f"剩餘 {st.session_state['remaining_count_long']} 首")
-    
-    if col_btn6.button("重置", key="btn_long_reset"):
-        st.session_state['long_idx'] = 0
-        st.session_state['displayed_long'] = pd.DataFrame()
-        st.session_state['remaining_count_long'] = 0
-        st.session_state['show_no_more_long'] = False
-        st.rerun()
\ No newline at end of file
+# ===== Section 2: Frequent Not Liked =====
+with col2:
+    st.header("常聽但未按讚")
+    st.caption(f"未按讚的歌 & 聆聽量整體前 {(1-top)*100:.1f} %")
+    card_section('frequent', df_frequent_sorted, index_key + (top,), display_cards_frequent)
+
+
+# ===== Section 3: Long Love =====
+with col3:
+    st.header("回味經典")
+    long_section(gap_index, index_key)
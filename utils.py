@@ -1,3 +1,4 @@
+from dataclasses import dataclass
 import streamlit as st
 
 def apply_pills_style():
@@ -60,4 +61,64 @@ def apply_pills_style():
             box-shadow: none !important;
         }
     </style>
-    """, unsafe_allow_html=True)
\ No newline at end of file
+    """, unsafe_allow_html=True)
+
+def get_selected_dates(store):
+    """
+    取得分析區間
+    - 有 play store：Home page 選的 start_date / end_date（尚未選擇則為 None）
+    - 靜態 demo：固定的 demo 區間
+    """
+    from analytics.play_store import DEMO_START, DEMO_END
+    if store is None:
+        return DEMO_START, DEMO_END
+    return st.session_state.get('start_date'), st.session_state.get('end_date')
+
+
+@dataclass
+class PageCursor:
+    """
+    卡片清單的分頁游標：session_state 只存 (清單版本, offset, 是否已到底)，不存 DataFrame
+    卡片每次都從快取好的排序結果 slice；清單版本（資料版本 + 門檻）改變時自動回到開頭
+
+    Parameters:
+    - key: session_state 的 key
+    - version: 清單的版本 key
+    - page_size: 每按一次多顯示幾筆
+    """
+    key: str
+    version: tuple
+    page_size: int = 3
+
+    @property
+    def _state(self) -> dict:
+        state = st.session_state.get(self.key)
+        if state is None or state['version'] != self.version:
+            state = st.session_state[self.key] = {'version': self.version, 'offset': 0, 'exhausted': False}
+        return state
+
+    @property
+    def offset(self) -> int:
+        return self._state['offset']
+
+    @property
+    def exhausted(self) -> bool:
+        """上一次按「顯示」時已經沒有更多資料"""
+        return self._state['exhausted']
+
+    def next(self, total: int):
+        """button 的 on_click：往後一頁（到底了就只記錄 exhausted，保留目前這頁）"""
+        state = self._state
+        state['exhausted'] = state['offset'] >= total
+        if not state['exhausted']:
+            state['offset'] += self.page_size
+
+    def reset(self):
+        st.session_state.pop(self.key, None)
+
+    def page(self, rows):
+        """目前這一頁的資料（offset 之前的 page_size 筆）"""
+        return rows.iloc[max(self.offset - self.page_size, 0):self.offset]
+
+    def remaining(self, total: int) -> int:
+        return total - self.offset
@@ -0,0 +1,149 @@
+"""
+建好的 Plotly figure 快取（process 共用，所有 session 共享）
+
+key = (figure 名稱, dataset 版本, 參數)：資料版本或任何參數（點的大小、顏色、genre / n、門檻…）
+改變都是不同的 key，不需要主動失效。
+存的是 figure 的 JSON（不可變，大小可以直接量），總大小超過 MAX_BYTES 時從最久沒用到的開始丟；
+命中時從 JSON 重建 Figure，比重新整理資料 + plotly express 便宜，每個 session 拿到的也是獨立的物件。
+建好的 figure 先經過 payload.compact，快取和送到前端的都是壓縮後的版本。
+
+JSON 的長度就是 st.plotly_chart 送出的 bytes：PagePayload 用它記錄每一頁每張圖的大小，
+一頁的總和超過 FIGURE_PAGE_BUDGET_KB 時寫 warning log。
+"""
+import logging, os, threading
+from collections import OrderedDict
+import pandas as pd
+import plotly.graph_objects as go
+import plotly.io as pio
+import streamlit as st
+from visualizations.payload import compact
+
+logger = logging.getLogger(__name__)
+
+MAX_BYTES = int(float(os.getenv("FIGURE_CACHE_MB", 32)) * 2**20)
+PAGE_BUDGET_BYTES = int(float(os.getenv("FIGURE_PAGE_BUDGET_KB", 512)) * 1024)
+
+
+class FigureCache:
+    def __init__(self, max_bytes: int = MAX_BYTES):
+        self.max_bytes = max_bytes
+        self._entries: OrderedDict[tuple, bytes] = OrderedDict()
+        self._bytes = 0
+        self._stats: dict[str, list[int]] = {}  # figure 名稱 -> [hits, misses, evictions]
+        self._lock = threading.Lock()
+
+    def get(self, name: str, version, params: tuple, build) -> go.Figure:
+        return self.get_sized(name, version, params, build)[0]
+
+    def get_sized(self, name: str, version, params: tuple, build) -> tuple[go.Figure, int]:
+        """
+        回傳 (name, version, params) 的 (figure, JSON bytes)，沒有快取時呼叫 build() 建立
+
+        Parameters:
+        - name: figure 名稱（統計用）
+        - version: dataset 版本（registry 的檔案 hash、store 版本 + 日期區間…）
+        - params: 影響 figure 的其他參數，必須 hashable
+        - build: 沒有命中時建立 figure 的函式
+        """
+        key = (name, version, params)
+        with self._lock:
+            stats = self._stats.setdefault(name, [0, 0, 0])
+            spec = self._entries.get(key)
+            if spec is not None:
+                self._entries.move_to_end(key)
+                stats[0] += 1
+        if spec is not None:
+            return pio.from_json(spec, skip_invalid=True), len(spec)
+
+        fig = compact(build())
+        spec = pio.to_json(fig, validate=False).encode()
+        with self._lock:
+            stats[1] += 1
+            if key not in self._entries and len(spec) <= self.max_bytes:
+                self._entries[key] = spec
+                self._bytes += len(spec)
+                while self._bytes > self.max_bytes:
+                    (evicted, _, _), old = self._entries.popitem(last=False)
+                    self._bytes -= len(old)
+                    self._stats[evicted][2] += 1
+        return fig, len(spec)
+
+    def stats(self) -> pd.DataFrame:
+        """每種 figure 的 hit / miss / 命中率、目前快取的數量與大小"""
+        with self._lock:
+            sizes = {}
+            for (name, _, _), spec in self._entries.items():
+                count, size = sizes.get(name, (0, 0))
+                sizes[name] = (count + 1, size + len(spec))
+            rows = [{
+                'figure': name,
+                'hits': hits,
+                'misses': misses,
+                'hit_rate': round(hits / (hits + misses), 3) if hits + misses else 0.0,
+                'cached': sizes.get(name, (0, 0))[0],
+                'kb': round(sizes.get(name, (0, 0))[1] / 1024, 1),
+                'evictions': evictions
+            } for name, (hits, misses, evictions) in self._stats.items()]
+        return pd.DataFrame(rows, columns=['figure', 'hits', 'misses', 'hit_rate', 'cached', 'kb', 'evictions'])
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+
+figures = FigureCache()
+
+
+class PayloadLog:
+    """process 共用：每一頁最近一次 run 各張圖的 bytes（給 Home 顯示）"""
+    def __init__(self):
+        self._pages: dict[str, dict[str, int]] = {}
+        self._lock = threading.Lock()
+
+    def record(self, page: str, sizes: dict[str, int]):
+        with self._lock:
+            self._pages[page] = dict(sizes)
+
+    def stats(self, budget: int = PAGE_BUDGET_BYTES) -> pd.DataFrame:
+        with self._lock:
+            rows = [{'page': page, 'figure': name, 'kb': round(size / 1024, 1),
+                     'page_kb': round(sum(sizes.values()) / 1024, 1), 'budget_kb': round(budget / 1024),
+                     'over_budget': sum(sizes.values()) > budget}
+                    for page, sizes in self._pages.items() for name, size in sizes.items()]
+        return pd.DataFrame(rows, columns=['page', 'figure', 'kb', 'page_kb', 'budget_kb', 'over_budget'])
+
+
+payload_log = PayloadLog()
+
+
+class PagePayload:
+    """
+    一頁在一次 script run 裡送出的 figure：透過 figure cache 取圖、畫出來、記錄 bytes
+
+    Parameters:
+    - page: 頁面名稱（log 用）
+    - budget: 這一頁所有 figure 加起來的 bytes 上限（預設 FIGURE_PAGE_BUDGET_KB）
+    """
+    def __init__(self, page: str, budget: int = PAGE_BUDGET_BYTES):
+        self.page = page
+        self.budget = budget
+        self.sizes: dict[str, int] = {}
+
+    @property
+    def total(self) -> int:
+        return sum(self.sizes.values())
+
+    def chart(self, name: str, version, params: tuple, build, **kwargs):
+        """figures.get + st.plotly_chart；kwargs 傳給 st.plotly_chart"""
+        fig, size = figures.get_sized(name, version, params, build)
+        over = self.total <= self.budget < self.total + size
+        self.sizes[name] = size
+        payload_log.record(self.page, self.sizes)
+        logger.info("%s / %s: %.1f KB (page %.1f KB)", self.page, name, size / 1024, self.total / 1024)
+        if over:
+            logger.warning("%s: figure payload %.1f KB is over the %.0f KB budget (%s)",
+                           self.page, self.total / 1024, self.budget / 1024,
+                           ', '.join(f"{n} {s / 1024:.1f} KB" for n, s in self.sizes.items()))
+        st.plotly_chart(fig, **kwargs)
+        return fig
@@ -1,11 +1,8 @@
 import pandas as pd
 import plotly.express as px
 import plotly.graph_objects as go
-import streamlit as st
-from pathlib import Path
-
-
-liked_songs = pd.read_csv(Path(__file__).parent.parent / "data" / "liked.csv")
+from analytics.artists import join_artists
+from analytics.liked_songs import get_liked_store
 
 
 def transform_artists(df):
@@ -18,32 +15,28 @@ def transform_artists(df):
     group_cols = ['id', 'track', 'count']
     if 'added_at' in df.columns:
         group_cols.append('added_at')
-    
-    return (df.groupby(group_cols, dropna=False)
-              .agg({'artist': lambda x: ', '.join(x.dropna())})
-              .reset_index()
-              .rename(columns={'id': 'track_id'}))
+
+    # ngroup 的編號就是 groupby 排序後的順序；歌手合併用類別代碼逐位接上，不跑 per-group lambda
+    groups = df.groupby(group_cols, dropna=False, sort=True).ngroup().to_numpy()
+    out = df[group_cols].assign(_group=groups).drop_duplicates('_group').sort_values('_group')
+    out['artist'] = join_artists(groups, df['artist'], len(out))
+    return out.drop(columns='_group').reset_index(drop=True).rename(columns={'id': 'track_id'})
 
 
-@st.cache_data(ttl=3600)
 def get_rate(start_date, end_date, analysis_start, analysis_end):
     """
     計算時間區間內的按讚率、frequent_not_liked rate
     
     Parameters:
-    - start_date, end_date: supabase 資料收集範圍
-    - analysis_start, analysis_end: 喜歡但少聽
-    Returns: (liked_count, total_count)
+    - start_date, end_date: supabase 資料收集範圍（UTC）
+    - analysis_start, analysis_end: 喜歡但少聽（UTC 日期，含頭含尾）
+    Returns: (liked_count, liked_count_a)
     """
-    liked_songs['added_at'] = pd.to_datetime(liked_songs['added_at'])
-    start_date = pd.to_datetime(start_date).tz_localize('UTC')
-    end_date = pd.to_datetime(end_date).tz_localize('UTC')
-    liked_count = liked_songs['added_at'].between(start_date, end_date).sum()
+    liked = get_liked_store()  # 已依 added_at 排序，兩個區間都是 binary search
+    liked_count = liked.count_between(start_date, end_date)
 
-    analysis_start = pd.to_datetime(analysis_start).tz_localize('UTC')  # 自動變成 00:00:00
     analysis_end = pd.to_datetime(analysis_end) + pd.Timedelta(days=1) - pd.Timedelta(seconds=1)  # 變成 23:59:59
-    analysis_end = analysis_end.tz_localize('UTC')
-    liked_count_a = liked_songs['added_at'].between(analysis_start, analysis_end).sum()
+    liked_count_a = liked.count_between(analysis_start, analysis_end)
 
     return liked_count, liked_count_a
 
@@ -61,19 +54,6 @@ def filter_by_liked_date(df, analysis_start, analysis_end):
     return df[df['added_at'].between(analysis_start, analysis_end)]
 
 
-def filter_by_long_days(df, long_days):
-    """
-    篩選「很久以前按讚」的歌
-    
-    Parameters:
-    - df: 包含 added_at 欄位的 df
-    - long_days: 定義「很久」= 距今幾天
-    """
-    cutoff_date = pd.Timestamp.now() - pd.Timedelta(days=long_days)
-    df['added_at'] = pd.to_datetime(df['added_at'])
-    return df[df['added_at'] < cutoff_date]
-
-
 if __name__=="__main__":
     # df_forgotten, df_frequent_not_liked, df = get_all_data(0.5, 0.5)
     # df_forgotten.to_parquet("./data/page4/df_forgotten.parquet")
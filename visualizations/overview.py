@@ -1,4 +1,4 @@
-import pandas as pd, calendar
+import numpy as np, pandas as pd, calendar
 from datetime import date, timedelta
 import plotly.express as px
 import plotly.graph_objects as go
@@ -135,6 +135,68 @@ def create_listening_heatmap(full_df: pd.DataFrame, size, color_light, color_dar
     return fig
 
 
+CALENDAR_WEEKS = 54        # 一年最多跨 54 週（週一開始）
+CALENDAR_GAP = 2           # 每年區塊上方留給月份標籤的空白列
+CALENDAR_ROWS = CALENDAR_GAP + 7
+MONTH_NAMES = ['Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun', 'Jul', 'Aug', 'Sep', 'Oct', 'Nov', 'Dec']
+
+
+def _calendar_cells(days: np.ndarray, year0: np.datetime64) -> tuple[np.ndarray, np.ndarray]:
+    """datetime64[D] -> 月曆矩陣的 (row, col)：每年一個區塊，row = 星期（Mon = 0），col = 第幾週"""
+    years = days.astype('datetime64[Y]')
+    jan1 = years.astype('datetime64[D]')
+    jan1_weekday = (jan1.astype('int64') + 3) % 7   # 1970-01-01 是星期四
+    weekday = (days.astype('int64') + 3) % 7
+    block = (years - year0).astype('int64')
+    col = ((days - jan1).astype('int64') + jan1_weekday) // 7
+    return block * CALENDAR_ROWS + CALENDAR_GAP + weekday, col
+
+
+def create_calendar_heatmap(full_df: pd.DataFrame, color_light, color_dark) -> go.Figure:
+    """
+    多年份的月曆 heatmap（small multiples）：每年一個 7 × 54 的區塊，上下排成一個 dense 矩陣，
+    整張圖只有一個 go.Heatmap trace；月份 / 年份 / 星期標籤都是軸的 tick，一次設定
+    """
+    days = full_df['day'].to_numpy(dtype='datetime64[D]')
+    year0, year1 = days.min().astype('datetime64[Y]'), days.max().astype('datetime64[Y]')
+    n_years = int((year1 - year0).astype('int64')) + 1
+
+    row, col = _calendar_cells(days, year0)
+    z = np.full((n_years * CALENDAR_ROWS, CALENDAR_WEEKS), np.nan, dtype=np.float32)
+    z[row, col] = full_df['hours'].to_numpy()
+    dates = np.full(z.shape, None, dtype=object)
+    dates[row, col] = np.datetime_as_string(days)
+
+    fig = go.Figure(data=go.Heatmap(
+        z=z,
+        customdata=dates,
+        colorscale=[[0.0, color_light], [1.0, color_dark]],
+        xgap=2, ygap=2,
+        hoverongaps=False,
+        colorbar=dict(title="Hours"),
+        hovertemplate='<b>%{customdata}</b><br>Duration: %{z:.1f} hrs<extra></extra>'
+    ))
+
+    # 月份標籤放在上方的 x 軸（每個月 15 號所在的週，各年份最多差一週），所有年份共用
+    month_cols = (np.cumsum([0, 31, 28, 31, 30, 31, 30, 31, 31, 30, 31, 30]) + 14 + 3) / 7
+    # y 軸：每個區塊的 Mon / Wed / Fri，區塊上方的空白列放年份
+    blocks = np.arange(n_years)[:, None] * CALENDAR_ROWS
+    tickvals = np.hstack([blocks + CALENDAR_GAP / 2 - 0.5, blocks + CALENDAR_GAP + np.array([0, 2, 4])]).ravel()
+    ticktext = [t for b in range(n_years) for t in (f"<b>{int(str(year0)) + b}</b>", 'Mon', 'Wed', 'Fri')]
+
+    fig.update_layout(
+        title='Listening Calendar Heatmap',
+        xaxis=dict(side='top', tickmode='array', tickvals=month_cols.tolist(), ticktext=MONTH_NAMES,
+                   tickfont=dict(size=13, weight='bold'), showgrid=False, zeroline=False),
+        yaxis=dict(tickmode='array', tickvals=tickvals.tolist(), ticktext=ticktext,
+                   autorange='reversed', showgrid=False, zeroline=False),
+        height=120 + 150 * n_years,
+        plot_bgcolor='white',
+        margin=dict(l=50, r=50, t=80, b=20)
+    )
+    return fig
+
+
 def create_context_pie(df: pd.DataFrame) -> go.Figure:
     fig = px.pie(
         df,
@@ -0,0 +1,259 @@
+"""
+送到前端的 Plotly figure payload 壓縮
+
+compact(fig) 在 figure 建好後（進 figure cache 之前）整理 trace 裡的陣列，畫出來 / hover 的內容不變：
+- 數值陣列用最小的 typed array（base64 bdata）：整數值 -> 最小的整數型別；
+  只被畫出來、或 template 裡一定帶格式（%{z:.1f}）的浮點數 -> float32；
+  會原樣顯示的浮點數不降精度（沒有格式的 %{x} 會把 float32 的誤差顯示出來），JSON 比 bdata 短時就送 JSON
+- 日期陣列用最短的 ISO 字串（'2025-10-27T15:51:02'，不是到奈秒）
+- 重複的字串不再送兩次：
+  customdata 沒被 template 用到的欄位丟掉；整欄同一個值 -> 直接寫進 hovertemplate；
+  text / customdata 某一欄和 x / y / labels 相同 -> template 改成引用那個欄位；ids 和 labels 相同 -> 不送 ids；
+  scatter 的 customdata 字串大量重複時（例如每個 session 都帶著專輯的藝人），
+  依這些欄位拆成多個 trace，字串寫進各自的 hovertemplate（只有拆完比較小時才拆）
+"""
+import re
+import numpy as np, pandas as pd
+import plotly.graph_objects as go
+import plotly.io as pio
+
+MIN_LENGTH = 8              # 太短的陣列 bdata 沒有比較小
+FLOAT32_MAX_ABS = 1e5       # 帶格式顯示的值超過這個大小就保留 float64
+MAX_SPLIT_GROUPS = 100      # 拆 trace 最多拆成幾個
+
+_INT_TYPES = [np.int8, np.uint8, np.int16, np.uint16, np.int32, np.uint32]
+# 點的位置欄位 -> template 裡引用它的寫法
+_POSITIONAL = {'x': '%{x}', 'y': '%{y}', 'labels': '%{label}', 'ids': '%{id}'}
+_GRID_TYPES = {'heatmap', 'contour', 'surface', 'histogram2d'}   # customdata 是格子矩陣，不是每個點一列
+_SPLIT_TYPES = {'scatter': go.Scatter, 'scattergl': go.Scattergl}
+_TEMPLATES = ['hovertemplate', 'texttemplate']
+_REFERENCE = re.compile(r'%\{([\w.\[\]]+)([:|][^}]*)?\}')
+_CUSTOMDATA = re.compile(r'%\{customdata(?:\[(\d+)\])?([:|][^}]*)?\}')
+
+
+def _template(trace, name) -> str | None:
+    value = trace[name] if name in trace else None
+    return value if isinstance(value, str) else None
+
+
+def _references(trace) -> dict[str, list[str]] | None:
+    """
+    template 裡引用的欄位 -> 用到的格式（'' 代表沒有格式）
+    沒有 hovertemplate 時回傳 None（plotly 預設的 hover 會原樣顯示所有欄位）
+    """
+    if _template(trace, 'hovertemplate') is None:
+        return None
+    refs = {}
+    for name in _TEMPLATES:
+        for field, fmt in _REFERENCE.findall(_template(trace, name) or ''):
+            refs.setdefault(field, []).append(fmt)
+    return refs
+
+
+def _formatted(refs, name: str) -> bool:
+    """這個欄位只被畫出來、或 template 裡每次引用都帶數字格式"""
+    return refs is not None and all(fmt.startswith(':') for fmt in refs.get(name, []))
+
+
+def _reference_name(path: tuple) -> str:
+    """trace 裡的路徑 -> template 裡的名稱，例如 ('marker', 'color') -> 'marker.color'、('values',) -> 'value'"""
+    name = '.'.join(path)
+    return {'values': 'value', 'labels': 'label', 'ids': 'id', 'marker.colors': 'color'}.get(name, name)
+
+
+def _compact_numeric(values, formatted: bool):
+    """
+    數值陣列 -> 最小的編碼；不是數值陣列時回傳 None（回傳 list 代表送 JSON 比較短）
+    formatted: 這個欄位只被畫出來、或顯示時一定帶格式，可以用 float32
+    """
+    arr = np.asarray(values)
+    if arr.dtype.kind not in 'iuf' or arr.size < MIN_LENGTH:
+        return None
+    if arr.dtype.kind in 'iu' or (np.isfinite(arr).all() and np.array_equal(arr, np.round(arr))):
+        lo, hi = arr.min(), arr.max()
+        for dtype in _INT_TYPES:
+            if np.iinfo(dtype).min <= lo and hi <= np.iinfo(dtype).max:
+                return arr.astype(dtype)
+    if arr.dtype.kind != 'f' or arr.dtype == np.float32:
+        return arr
+    arr = arr.astype(np.float64)
+    largest = np.nanmax(np.abs(arr)) if not np.isnan(arr).all() else 0
+    if np.array_equal(arr.astype(np.float32), arr, equal_nan=True) or (formatted and largest < FLOAT32_MAX_ABS):
+        return arr.astype(np.float32)
+    as_json = sum(len(repr(v)) + 1 for v in arr.ravel().tolist())
+    return arr.tolist() if as_json < (arr.size * 8 + 2) // 3 * 4 else arr
+
+
+def _compact_dates(values) -> np.ndarray | None:
+    """datetime64 陣列 -> 最短的 ISO 字串（有 NaT 時不動）"""
+    arr = np.asarray(values)
+    if arr.dtype.kind != 'M' or arr.size < MIN_LENGTH or np.isnat(arr).any():
+        return None
+    for unit in ('D', 'm', 's', 'ms'):
+        if (arr.astype(f'datetime64[{unit}]') == arr).all():
+            return np.datetime_as_string(arr, unit=unit).astype(object)
+    return None
+
+
+def _array_paths(obj: dict, prefix=()) -> list[tuple]:
+    """trace（plotly json）裡所有陣列值的路徑，例如 ('y',)、('marker', 'color')"""
+    paths = []
+    for key, value in obj.items():
+        if isinstance(value, dict):
+            paths += _array_paths(value, prefix + (key,))
+        elif isinstance(value, (list, tuple, np.ndarray, pd.Series)) and key not in ('colorscale', 'customdata'):
+            paths.append(prefix + (key,))
+    return paths
+
+
+def _strings(values) -> np.ndarray | None:
+    arr = np.asarray(values, dtype=object)
+    return arr if arr.size and all(isinstance(v, str) for v in arr.ravel()) else None
+
+
+def _same_as_positional(trace, values: np.ndarray) -> str | None:
+    """values 和 trace 的 x / y / labels / ids 其中一個完全相同時回傳那個欄位名稱"""
+    for field in _POSITIONAL:
+        other = trace[field] if field in trace else None
+        if other is not None and not isinstance(other, str) and len(other) == len(values) \
+                and np.array_equal(np.asarray(other, dtype=object), values):
+            return field
+    return None
+
+
+def _literal(value: str) -> bool:
+    """可以直接寫進 template 的字串（不能含有 template 語法）"""
+    return '%{' not in value and '}' not in value
+
+
+def _dedup_text(trace):
+    """text 和 x / y / labels 相同：template 改成引用那個欄位，不再送 text"""
+    text = _strings(trace.text) if 'text' in trace and trace.text is not None else None
+    if text is None or text.ndim != 1 or not all(_template(trace, n) is not None for n in _TEMPLATES):
+        return
+    field = _same_as_positional(trace, text)
+    if field is not None:
+        for name in _TEMPLATES:
+            trace[name] = trace[name].replace('%{text}', _POSITIONAL[field])
+        trace.text = None
+
+
+def _dedup_ids(trace):
+    """ids 和 labels 完全相同（而且不重複）時不需要 ids"""
+    if 'ids' not in trace or trace.ids is None or 'labels' not in trace or trace.labels is None:
+        return
+    ids = np.asarray(trace.ids, dtype=object)
+    refs = _references(trace)
+    if refs is not None and 'id' not in refs and len(set(ids.tolist())) == len(ids) \
+            and np.array_equal(ids, np.asarray(trace.labels, dtype=object)):
+        trace.ids = None
+
+
+def _customdata(trace) -> np.ndarray | None:
+    """每個點一列的 customdata（只處理有 hovertemplate、不是格子矩陣的 trace）"""
+    if trace.customdata is None or trace.type in _GRID_TYPES or _template(trace, 'hovertemplate') is None:
+        return None
+    data = np.asarray(trace.customdata, dtype=object)
+    if len(data) == 0 or data.ndim > 2:
+        return None
+    return data.reshape(len(data), -1)
+
+
+def _replace_columns(trace, data: np.ndarray, replacements: dict[int, str]):
+    """
+    %{customdata[j]}（一維時是 %{customdata}）換成 replacements[j]（常數 / 其他欄位）；
+    沒被 template 用到的欄位丟掉，保留的欄位重新編號
+    """
+    used = {int(j or 0) for name in _TEMPLATES for j, _ in _CUSTOMDATA.findall(_template(trace, name) or '')}
+    keep = [j for j in range(data.shape[1]) if j in used and j not in replacements]
+
+    def sub(match):
+        j = int(match.group(1) or 0)
+        if j in replacements:
+            return replacements[j]
+        return '%{customdata[' + str(keep.index(j)) + ']' + (match.group(2) or '') + '}'
+    for name in _TEMPLATES:
+        if _template(trace, name) is not None:
+            trace[name] = _CUSTOMDATA.sub(sub, trace[name])
+    trace.customdata = data[:, keep] if keep else None
+
+
+def _dedup_customdata(trace):
+    """customdata 的字串欄：整欄同一個值 -> 寫進 template；和 x / y / labels 相同 -> 引用那個欄位"""
+    data = _customdata(trace)
+    if data is None:
+        return
+    replacements = {}
+    for j in range(data.shape[1]):
+        column = _strings(data[:, j])
+        if column is None:
+            continue
+        if (column == column[0]).all() and _literal(column[0]):
+            replacements[j] = column[0]
+        elif (field := _same_as_positional(trace, column)) is not None:
+            replacements[j] = _POSITIONAL[field]
+    _replace_columns(trace, data, replacements)
+
+
+def _split_repeated(trace) -> list | None:
+    """
+    customdata 字串欄裡大量重複的值：依這些欄位把 scatter 拆成多個 trace，值寫進各自的 hovertemplate
+    回傳拆好的 trace（比原本的 JSON 短時）或 None：每個 trace 本身也有幾百 bytes，組數多、每組點少時拆了反而比較大
+    """
+    data = _customdata(trace)
+    if data is None or trace.type not in _SPLIT_TYPES:
+        return None
+    n = len(data)
+    repeated = [j for j in range(data.shape[1]) if (column := _strings(data[:, j])) is not None
+                and len(set(column.tolist())) * 4 <= n and all(_literal(v) for v in column)]
+    if not repeated:
+        return None
+    groups, inverse = np.unique(data[:, repeated].astype(str), axis=0, return_inverse=True)
+    if len(groups) > MAX_SPLIT_GROUPS:
+        return None
+
+    spec = {k: v for k, v in trace.to_plotly_json().items() if k not in ('type', 'customdata')}
+    per_point = [p for p in _array_paths(spec) if np.ndim(trace[p]) == 1 and len(trace[p]) == n]
+    traces = []
+    for g, values in enumerate(groups):
+        rows = np.flatnonzero(inverse.ravel() == g)
+        part = _SPLIT_TYPES[trace.type](spec)
+        for path in per_point:
+            part[path] = np.asarray(trace[path])[rows]
+        _replace_columns(part, data[rows], dict(zip(repeated, values.tolist())))
+        part.showlegend = False
+        traces.append(part)
+
+    before = len(pio.to_json(trace, validate=False))
+    after = sum(len(pio.to_json(t, validate=False)) for t in traces)
+    return traces if after < before else None
+
+
+def _compact_arrays(trace):
+    refs = _references(trace)
+    for path in _array_paths(trace.to_plotly_json()):
+        dates = _compact_dates(trace[path])
+        values = dates if dates is not None else _compact_numeric(trace[path], _formatted(refs, _reference_name(path)))
+        if values is not None:
+            trace[path] = values
+    if trace.customdata is not None:
+        # 全部是數值的 customdata（例如 heatmap 每格的值）
+        names = [f for f in (refs or {}) if f.startswith('customdata')]
+        values = _compact_numeric(trace.customdata, all(_formatted(refs, f) for f in names))
+        if values is not None:
+            trace.customdata = values
+
+
+def compact(fig: go.Figure) -> go.Figure:
+    """壓縮 fig 的 trace 陣列並回傳壓縮後的 figure（畫出來的結果不變）"""
+    traces = []
+    for trace in fig.data:
+        _dedup_text(trace)
+        _dedup_ids(trace)
+        _dedup_customdata(trace)
+        for part in _split_repeated(trace) or [trace]:
+            _compact_arrays(part)
+            traces.append(part)
+    if len(traces) != len(fig.data):
+        fig = go.Figure(data=traces, layout=fig.layout)
+    return fig
@@ -1,7 +1,7 @@
+import threading
+from collections import OrderedDict
 import pandas as pd, numpy as np
-import plotly.express as px
 import plotly.graph_objects as go
-import streamlit as st
 
 COLORS = ['#d1dbe4', '#d1dbe4', '#7593af', '#476f95', '#194a7a',
           '#d9d0b4', '#7d6b57', '#879e82', '#666b5e',
@@ -25,94 +25,119 @@ def calculate_rankings(df):
     return df_detail
 
 
-def create_sparkline(avg_value, data, labels, color, fillcolor, title=''):
+def create_sparkline_strip(values, labels, specs, height=100, spacing=0.04):
     """
-    建立 Plotly sparkline
-    
+    一個 figure 畫所有指標卡片的 sparkline（1 × N 個 subplot，一次序列化、一次 plotly init）
+    N 個 subplot 的軸直接寫在 layout 裡，不經過 make_subplots / add_trace(row, col)
+
     Parameters:
-    - data: 數值列表（28 個點）
-    - labels: 標籤列表（用於 hover）
-    - color: 線條顏色
-    - title: 圖表標題（用於 hover）
+    - values: (N, 28) 的數值陣列，每列一個指標
+    - labels: 28 個 slot 的標籤（用於 hover），所有指標共用
+    - specs: N 個 dict {avg: 基準線, color: 線條顏色, fillcolor: 填色, title: hover 標題}
     """
-    fig = go.Figure()
+    values = np.asarray(values, dtype=np.float64)
+    labels = np.asarray(labels, dtype=object)
+    n, n_slots = len(specs), values.shape[1]
+    width = (1 - spacing * (n - 1)) / n
 
-    fig.add_trace(go.Scatter(
-        y=[avg_value] * 28,
-        mode='lines',
-        line=dict(width=0),
-        showlegend=False,
-        hoverinfo='skip',
-        name=''
-    ))
+    data, axes = [], {}
+    for i, spec in enumerate(specs):
+        # subplot 的軸：x / y, x2 / y2, ...
+        suffix = str(i + 1) if i else ''
+        axes[f'xaxis{suffix}'] = dict(domain=[i * (width + spacing), i * (width + spacing) + width],
+                                      anchor=f'y{suffix}', visible=False, showgrid=False)
+        axes[f'yaxis{suffix}'] = dict(anchor=f'x{suffix}', visible=False, showgrid=False)
 
-    # 實際資料
-    fig.add_trace(go.Scatter(
-        y=[x for x in data],
-        mode='lines',
-        line=dict(color=color, width=2),
-        fill='tonexty',
-        fillcolor=fillcolor,
-        text=labels,
-        hovertemplate='<b>%{text}</b><br>' + title + ': %{y}<extra></extra>',
-        showlegend=False
-    ))
+        # 基準線只需要兩個端點，實際資料填到基準線
+        data.append(go.Scatter(
+            x=[0, n_slots - 1], y=[spec['avg'], spec['avg']], xaxis=f'x{suffix}', yaxis=f'y{suffix}',
+            mode='lines', line=dict(width=0), hoverinfo='skip', name=''
+        ))
+        data.append(go.Scatter(
+            y=values[i], xaxis=f'x{suffix}', yaxis=f'y{suffix}',
+            mode='lines',
+            line=dict(color=spec['color'], width=2),
+            fill='tonexty',
+            fillcolor=spec['fillcolor'],
+            text=labels,
+            hovertemplate='<b>%{text}</b><br>' + spec['title'] + ': %{y}<extra></extra>',
+        ))
 
-    fig.update_layout(
-        height=100,
+    return go.Figure(data=data, layout=dict(
+        **axes,
+        height=height,
         margin=dict(l=0, r=0, t=0, b=0, pad=0),
-        xaxis=dict(visible=False, showgrid=False),
-        yaxis=dict(visible=False, showgrid=False),
         paper_bgcolor='rgba(0,0,0,0)',
         plot_bgcolor='rgba(0,0,0,0)',
         showlegend=False,
         hovermode='closest'
-    )
-    return fig
+    ))
 
-def format_time_slot_label(row):
-    """格式化時段標籤（用於 hover）"""
-    days = ['Sun', 'Mon', 'Tue', 'Wed', 'Thu', 'Fri', 'Sat']
-    return f"{days[int(row['day_of_week'])]} {row['time_period']}"
+def format_time_slot_labels(df) -> np.ndarray:
+    """格式化時段標籤（用於 hover），例如 'Mon Morning'"""
+    days = np.array(['Sun', 'Mon', 'Tue', 'Wed', 'Thu', 'Fri', 'Sat'], dtype=object)
+    return days[df['day_of_week'].to_numpy().astype(np.int64)] + ' ' + df['time_period'].to_numpy(dtype=object)
 
-def create_full_heatmap(df, var, var_config):
+# heatmap 可選的指標 -> 顯示單位（total_time 存秒，顯示成小時）
+HEATMAP_METRICS = {'total_time': 'hrs', 'avg_skip_rate': '%', 'new_track_ratio': '%',
+                   'artist_concentration': '%', 'repeat_rate': '%'}
+TIME_ORDER = ['Late Night', 'Morning', 'Afternoon', 'Evening']
+
+
+class MetricTensor:
+    """
+    28 個 (星期, 時段) 細格 x 所有 heatmap 指標的 7 × 4 × M 數值與已格式化的標籤
+    每個資料版本建一次、之後不再修改；切換指標只是取一個 slice（不 pivot、不改輸入的 df）
     """
-    var: 要顯示的欄位名稱
+    def __init__(self, df: pd.DataFrame):
+        detail = df[df['day_of_week'].notna() & df['time_period'].notna()]
+        dow = detail['day_of_week'].to_numpy().astype(np.int64)
+        period = pd.Index(TIME_ORDER).get_indexer(detail['time_period'])
+
+        metrics = detail[list(HEATMAP_METRICS)].to_numpy(dtype=np.float64, copy=True)
+        metrics[:, 0] /= 3600
+        self.values = np.full((7, len(TIME_ORDER), len(HEATMAP_METRICS)), np.nan)
+        self.values[dow, period] = metrics
+
+        self.labels = np.full(self.values.shape, '', dtype=object)
+        for m, unit in enumerate(HEATMAP_METRICS.values()):
+            cells = metrics[:, m]
+            text = [f"{v * 100:.1f}%" if unit == '%' else f"{v:.1f} {unit}" for v in cells]
+            self.labels[dow, period, m] = np.where(np.isnan(cells), '', np.array(text, dtype=object))
+        self.values.flags.writeable = False
+        self.labels.flags.writeable = False
+
+    def slice(self, var) -> tuple[np.ndarray, np.ndarray]:
+        """(7 × 4 的數值, 7 × 4 的標籤)"""
+        m = list(HEATMAP_METRICS).index(var)
+        return self.values[:, :, m], self.labels[:, :, m]
+
+
+def create_full_heatmap(tensor: MetricTensor, var, var_config):
+    """
+    tensor: get_metric_tensor 的結果
+    var: 要顯示的欄位名稱（HEATMAP_METRICS 之一）
     var_config: dict 包含 {
         'title': 圖表標題,
         'colorbar_title': colorbar 標題,
         'unit': 單位 (如 'hrs', '%'),
-        'text_format': 文字格式 (如 '{:.1f}', '{:.1%}'),
         'hover_label': hover 時顯示的標籤
         'colorscale': 色階 (optional)
     }
     """
-    df['total_time'] = df['total_time']/3600
-    heatmap_data = df.pivot(index='day_of_week', columns='time_period', values=var)
-
-    # 定義時段順序
-    time_order = ['Late Night', 'Morning', 'Afternoon', 'Evening']
+    z, labels = tensor.slice(var)
     time_order_chinese = ['深夜', '早晨', '下午', '晚上']
-    heatmap_data = heatmap_data[time_order]
-
-    # 定義星期順序
-    day_labels = ['Sunday', 'Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday']
     day_labels_chinese = ['週日', '週一', '週二', '週三', '週四', '週五', '週六']
-    heatmap_data = heatmap_data.sort_index()
-
-    # 格式化顯示文字
-    if var_config['unit'] == '%':
-        display_text = (heatmap_data * 100).round(1).astype(str) + '%'
-    else:
-        display_text = heatmap_data.round(1).astype(str) + f" {var_config['unit']}"
 
-    # 建立 Heatmap
+    # 建立 Heatmap（hover 直接用算好的標籤）
     fig = go.Figure(data=go.Heatmap(
-        z=heatmap_data.values,
+        z=z,
         x=time_order_chinese,
         y=day_labels_chinese,
+        text=labels,
         colorscale=var_config.get('colorscale', [[0.0, "#CED6DE"], [1.0, '#476f95']]),
-        hovertemplate=f'<b>%{{y}}</b>%{{x}}<br>{var_config["hover_label"]}: %{{z{var_config["hover_format"]}}}<extra></extra>',
+        hovertemplate=f'<b>%{{y}}</b>%{{x}}<br>{var_config["hover_label"]}: %{{text}}<extra></extra>',
+        hoverongaps=False,
         colorbar=dict(
             ticksuffix=f" {var_config['unit']}" if var_config['unit'] != '%' else '',
             tickformat='.0%' if var_config['unit'] == '%' else '.1f'
@@ -134,67 +159,109 @@ def create_full_heatmap(df, var, var_config):
 
     return fig
 
-def get_mode_data(df, mode, comparison_mode):
+COMPARISON_METRICS = ['repeat_rate', 'avg_skip_rate', 'new_track_ratio', 'artist_concentration']
+
+# 比較選項 -> 可選的 mode（mode id 依這個順序）
+COMPARISON_MODES = {
+    "平日/週末": ["Weekday", "Weekend"],
+    "時段": ["Morning", "Afternoon", "Evening", "Late Night"],
+    "指定星期幾": ["Sun", "Mon", "Tue", "Wed", "Thu", "Fri", "Sat"],
+}
+OTHER_MODES = {"Other periods (avg)", "Other days (avg)"}
+
+
+def _comparison_masks() -> tuple[np.ndarray, np.ndarray]:
     """
-    根據 mode 和 comparison_mode 篩選資料並計算加權平均
-    回傳: dict with keys ['repeat_rate', 'avg_skip_rate', 'new_track_ratio', 'artist_concentration']
+    每個 (比較選項, mode) 用到 cube 的哪幾個 unit（7 個「每天」列 + 4 個「每時段」列）
+    回傳 (本身, 其他（同一個比較選項裡的其餘 unit）)，shape 都是 (3, 7, 11)
     """
-    metric_cols = ['repeat_rate', 'avg_skip_rate', 'new_track_ratio', 'artist_concentration']
-    
-    if comparison_mode == "平日/週末":
-        if mode == "Weekday":
-            rows = df[(df['day_of_week'].isin([1,2,3,4,5])) & (df['time_period'].isna())]
-        else:  # Weekend
-            rows = df[(df['day_of_week'].isin([0,6])) & (df['time_period'].isna())]
-    
-    elif comparison_mode == "時段":
-        if mode == "Other periods (avg)":
-            # 需要知道 mode1 是什麼，才能排除
-            # 這裡先回傳 None，後面特別處理
-            return None
-        else:
-            rows = df[(df['day_of_week'].isna()) & (df['time_period'] == mode)]
-    
-    elif comparison_mode == "指定星期幾":
-        if mode == "Other days (avg)":
-            return None
-        else:
-            day_map = {"Sun": 0, "Mon": 1, "Tue": 2, "Wed": 3, "Thu": 4, "Fri": 5, "Sat": 6}
-            rows = df[(df['day_of_week'] == day_map[mode]) & (df['time_period'].isna())]
-    
-    # 計算加權平均
-    if len(rows) == 0:
-        return {col: 0 for col in metric_cols}
-    elif len(rows) == 1:
-        return rows.iloc[0][metric_cols].to_dict()
-    else:
-        return {
-            col: np.average(rows[col], weights=rows['total_time'])
-            for col in metric_cols
-        }
-
-def get_other_avg(df, exclude_mode, comparison_mode):
-    """計算 Other periods/days 的加權平均（排除 exclude_mode）"""
-    metric_cols = ['repeat_rate', 'avg_skip_rate', 'new_track_ratio', 'artist_concentration']
-    
-    if comparison_mode == "時段":
-        time_periods = ["Morning", "Afternoon", "Evening", "Late Night"]
-        other_periods = [p for p in time_periods if p != exclude_mode]
-        rows = df[(df['day_of_week'].isna()) & (df['time_period'].isin(other_periods))]
-    
-    elif comparison_mode == "指定星期幾":
-        day_map = {"Sun": 0, "Mon": 1, "Tue": 2, "Wed": 3, "Thu": 4, "Fri": 5, "Sat": 6}
-        exclude_day = day_map[exclude_mode]
-        other_days = [d for d in range(7) if d != exclude_day]
-        rows = df[(df['day_of_week'].isin(other_days)) & (df['time_period'].isna())]
-    
-    if len(rows) == 0:
-        return {col: 0 for col in metric_cols}
-    
-    return {
-        col: np.average(rows[col], weights=rows['total_time'])
-        for col in metric_cols
+    days, periods = np.arange(7), 7 + np.arange(4)
+    members = {
+        "平日/週末": [days[1:6], days[[0, 6]]],
+        "時段": [periods[TIME_ORDER.index(p)] for p in COMPARISON_MODES["時段"]],
+        "指定星期幾": list(days),
     }
+    universe = {"平日/週末": days, "時段": periods, "指定星期幾": days}
+    own = np.zeros((len(COMPARISON_MODES), 7, 11), dtype=bool)
+    other = np.zeros_like(own)
+    for c, name in enumerate(COMPARISON_MODES):
+        for m, units in enumerate(members[name]):
+            own[c, m, units] = True
+            other[c, m, universe[name]] = True
+        other[c] &= ~own[c]
+    return own, other
+
+
+_OWN, _OTHER = _comparison_masks()
+
+
+class ComparisonTable:
+    """
+    「模式比較」的查表：所有 (比較選項, mode) 的時長加權平均一次算好
+    values[c, m, 0] 是 mode 本身，values[c, m, 1] 是同一個比較選項裡排除 mode 的其他部分（Other ... (avg)）
+    沒有資料的組合為 0（同原本的 get_mode_data / get_other_avg）
+    """
+    def __init__(self, df: pd.DataFrame):
+        day_rows = df[df['day_of_week'].notna() & df['time_period'].isna()]
+        period_rows = df[df['day_of_week'].isna() & df['time_period'].notna()]
+        units = pd.concat([
+            day_rows.set_index(day_rows['day_of_week'].astype(int))[['total_time'] + COMPARISON_METRICS]
+                    .reindex(range(7)),
+            period_rows.set_index('time_period')[['total_time'] + COMPARISON_METRICS].reindex(TIME_ORDER),
+        ])
+        present = units['total_time'].notna().to_numpy()
+        weights = units['total_time'].fillna(0).to_numpy(dtype=np.float64)
+        metrics = units[COMPARISON_METRICS].to_numpy(dtype=np.float64)
+
+        masks = np.stack([_OWN, _OTHER], axis=2) & present      # (3, 7, 2, 11)
+        n_rows = masks.sum(axis=-1, keepdims=True)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            weighted = (masks * weights) @ np.nan_to_num(metrics) / (masks @ weights)[..., None]
+        single = masks @ np.nan_to_num(metrics)                  # 只有一列時直接取那一列
+        values = np.where(n_rows == 1, single, weighted)
+        values = np.where(masks @ np.isnan(metrics) > 0, np.nan, values)
+        self.values = np.where(n_rows == 0, 0.0, values)
+        self.values.flags.writeable = False
+
+    def lookup(self, comparison_mode, mode, exclude_mode=None) -> dict:
+        """
+        回傳 {metric: 值}；mode 是 Other ... (avg) 時回傳排除 exclude_mode 的平均
+        """
+        c = list(COMPARISON_MODES).index(comparison_mode)
+        if mode in OTHER_MODES:
+            row = self.values[c, COMPARISON_MODES[comparison_mode].index(exclude_mode), 1]
+        else:
+            row = self.values[c, COMPARISON_MODES[comparison_mode].index(mode), 0]
+        return dict(zip(COMPARISON_METRICS, row.tolist()))
+
+
+MAX_TABLES = 16
+_tables: OrderedDict[tuple, object] = OrderedDict()
+_tables_lock = threading.Lock()
+
+
+def _get_table(cls, df: pd.DataFrame, version):
+    """每個資料版本（snapshot hash / store 版本 + 日期區間 + cube 參數）每種表只建一次"""
+    key = (cls.__name__, version)
+    with _tables_lock:
+        table = _tables.get(key)
+        if table is not None:
+            _tables.move_to_end(key)
+            return table
+    table = cls(df)
+    with _tables_lock:
+        _tables[key] = table
+        while len(_tables) > MAX_TABLES:
+            _tables.popitem(last=False)
+    return table
+
+
+def get_comparison_table(df: pd.DataFrame, version) -> ComparisonTable:
+    return _get_table(ComparisonTable, df, version)
+
+
+def get_metric_tensor(df: pd.DataFrame, version) -> 'MetricTensor':
+    return _get_table(MetricTensor, df, version)
 
 
 def create_grouped_bar(data1, data2, label1, label2):